@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Stand-in for `pwsh`/`powershell.exe` used by the benchmark suite. It speaks the
+session protocol of `core/powershell.PowerShellSession` (base64 script per
+stdin line, sentinel with exit status) and the one-shot `-File`/`-Command`
+forms, and answers the scripts the services send with canned `@@sensei` events.
+
+Environment:
+  SENSEI_FAKE_PS_STARTUP_MS  delay before the host accepts work (default 0)
+  SENSEI_FAKE_PS_MS          delay per script (default 0)
+  SENSEI_FAKE_REBOOT         value reported for the pending-reboot probe (default False)
+  SENSEI_FAKE_DRIVERS        number of driver updates the scan offers (default 0)
+  SENSEI_FAKE_DRIVER_FAIL    comma list of driver update ids whose install fails
+  SENSEI_FAKE_PSWU_VERSION   installed PSWindowsUpdate version, empty for none (default 2.2.1.5)
+"""
+import base64, json, os, re, sys, time
+
+def _env_ms(name: str) -> float:
+    try:
+        return float(os.environ.get(name, "0")) / 1000.0
+    except ValueError:
+        return 0.0
+
+def event(kind: str, **data) -> str:
+    return "@@sensei " + json.dumps({"event": kind, **data})
+
+def respond(script: str):
+    time.sleep(_env_ms("SENSEI_FAKE_PS_MS"))
+    if "RebootPending" in script:
+        pending = os.environ.get("SENSEI_FAKE_REBOOT", "False") == "True"
+        return [event("result", pending=pending, sources=["CBS"] if pending else [])], 0
+    if "Microsoft.Update.UpdateColl" in script:
+        ids = re.findall(r"'([^']+)'", re.search(r"\$ids = @\(([^)]*)\)", script).group(1))
+        failed = set((os.environ.get("SENSEI_FAKE_DRIVER_FAIL") or "").split(","))
+        return [event("progress", message="Scan is not in this session; installing by UpdateID.")] + \
+               [event("update", id=i, ok=i not in failed, result="Failed" if i in failed else "Installed") for i in ids] + [event("result", ok=not failed & set(ids), reboot=False, via="lookup")], 0
+    if "Get-WindowsUpdate" in script:
+        n = int(os.environ.get("SENSEI_FAKE_DRIVERS", "0") or 0)
+        rows = [event("row", Title=f"Fake Vendor - Driver {i}", KB=f"KB{5000000 + i}", Size=f"{i + 1}MB",
+                      UpdateId=f"00000000-0000-0000-0000-{i:012d}", Manufacturer="Fake Vendor") for i in range(n)]
+        return rows + [event("result", count=n)], 0
+    if "Win32_StartupCommand" in script:
+        return [event("row", Name="OneDrive", Command="C:\\OneDrive.exe /background", Location="HKU\\...\\Run", User="fake"),
+                event("result", ok=True)], 0
+    if "PSVersionTable" in script:
+        return [event("result", powershell="7.4.0", edition="Core", windows="Fake Windows", version="10.0.22631",
+                      build="22631", arch="64-bit")], 0
+    ver = os.environ.get("SENSEI_FAKE_PSWU_VERSION", "2.2.1.5") or None
+    if "Install-Module" in script:
+        return [event("progress", message="Installing PSWindowsUpdate..."), event("result", version=ver or "2.2.1.5", nuget=True)], 0
+    if "Get-Module -ListAvailable" in script:
+        return [event("result", version=ver)], 0
+    if "Clear-RecycleBin" in script or "Checkpoint-Computer" in script:
+        return [event("result", ok=True)], 0
+    return re.findall(r'Write-Host\s+"([^"]*)"', script), 0
+
+def serve():
+    time.sleep(_env_ms("SENSEI_FAKE_PS_STARTUP_MS"))
+    for line in sys.stdin:
+        parts = line.strip().split(" ", 1)
+        if len(parts) < 2: continue
+        token, payload = parts
+        try:
+            script = base64.b64decode(payload).decode("utf-8", errors="replace")
+        except Exception:
+            script = ""
+        lines, rc = respond(script)
+        for ln in lines: sys.stdout.write(ln + "\n")
+        sys.stdout.write(f"<<<SENSEI-END:{token}:{rc}>>>\n")
+        sys.stdout.flush()
+    return 0
+
+def main(argv):
+    if "-EncodedCommand" in argv:
+        return serve()
+    time.sleep(_env_ms("SENSEI_FAKE_PS_STARTUP_MS"))
+    script = ""
+    if "-File" in argv:
+        i = argv.index("-File")
+        with open(argv[i + 1], encoding="utf-8", errors="replace") as f:
+            script = f.read()
+    elif "-Command" in argv:
+        script = argv[argv.index("-Command") + 1]
+    lines, rc = respond(script)
+    for ln in lines: print(ln)
+    return rc
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
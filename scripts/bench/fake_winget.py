@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Stateful stand-in for `winget`, used by the benchmark suite on machines without
+Windows. Package state lives in a JSON database so installs are visible to the
+next scan.
+
+Environment:
+  SENSEI_FAKE_DB           path of the package database (created on first use)
+  SENSEI_FAKE_ROWS         packages to generate when the database is created (default 50)
+  SENSEI_FAKE_UPGRADABLE   fraction of packages with an available upgrade (default 0.5)
+  SENSEI_FAKE_LOCALE       en | de  table header language (default en)
+  SENSEI_FAKE_LATENCY_MS   fixed delay added to every call (default 0)
+  SENSEI_FAKE_SCAN_MS      extra delay for upgrade/list/search scans (default 0)
+  SENSEI_FAKE_INSTALL_MS   delay per install/upgrade/download (default 0)
+  SENSEI_FAKE_ROW_MS       delay before each table row is printed, to exercise streaming (default 0)
+  SENSEI_FAKE_PROGRESS     1 to print \\r progress bars during installs
+  SENSEI_FAKE_FAIL         comma list of id=code; `upgrade` of that id exits with code
+  SENSEI_FAKE_VERSION      value printed by --version (default v1.7.10861)
+"""
+import contextlib, json, os, random, sys, time
+from pathlib import Path
+
+HEADERS = {
+    "en": ("Name", "Id", "Version", "Available", "Source"),
+    "de": ("Name", "ID", "Version", "Verfügbar", "Quelle"),
+}
+FOOTER = {
+    "en": "{n} upgrades available.",
+    "de": "{n} Aktualisierungen verfügbar.",
+}
+NAME_WORDS = ["Studio", "Player", "Tools", "Runtime", "Editor", "Sync", "Café", "Viewer", "日本語エディタ", "Suite", "Client", "SDK"]
+TYPES = ["exe", "msi", "inno", "nullsoft", "zip", "portable", "msix", "wix", "burn"]
+
+def _env_ms(name: str) -> float:
+    try:
+        return float(os.environ.get(name, "0")) / 1000.0
+    except ValueError:
+        return 0.0
+
+def build_db(rows: int, upgradable: float=0.5, seed: int=7) -> dict:
+    rnd = random.Random(seed)
+    pkgs = []
+    for i in range(rows):
+        words = rnd.sample(NAME_WORDS, k=rnd.randint(1, 3))
+        name = f"Vendor{i} " + " ".join(words)
+        major = rnd.randint(1, 30)
+        installed = f"{major}.{rnd.randint(0, 9)}.{rnd.randint(0, 99)}"
+        available = ""
+        if rnd.random() < upgradable:
+            available = f"{major}.{rnd.randint(10, 19)}.{rnd.randint(0, 99)}"
+        pkgs.append({
+            "Id": f"Vendor{i}.App{i}",
+            "Name": name,
+            "Version": installed,
+            "Available": available,
+            "Source": "msstore" if i % 17 == 16 else "winget",
+            "InstallerType": TYPES[i % len(TYPES)],
+        })
+    return {"packages": pkgs}
+
+def db_path() -> Path:
+    return Path(os.environ.get("SENSEI_FAKE_DB") or (Path.home() / ".sensei-fake-winget.json"))
+
+def load_db() -> dict:
+    p = db_path()
+    if p.exists():
+        return json.loads(p.read_text(encoding="utf-8"))
+    db = build_db(int(os.environ.get("SENSEI_FAKE_ROWS", "50")), float(os.environ.get("SENSEI_FAKE_UPGRADABLE", "0.5")))
+    save_db(db)
+    return db
+
+def save_db(db: dict):
+    p = db_path()
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_suffix(p.suffix + ".tmp")
+    tmp.write_text(json.dumps(db), encoding="utf-8")
+    tmp.replace(p)
+
+@contextlib.contextmanager
+def db_lock():
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    p = db_path()
+    p.parent.mkdir(parents=True, exist_ok=True)
+    with open(str(p) + ".lock", "w") as fp:
+        fcntl.flock(fp, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fp, fcntl.LOCK_UN)
+
+def cell_width(s: str) -> int:
+    import unicodedata
+    return sum(2 if unicodedata.east_asian_width(c) in ("W", "F") else 1 for c in s)
+
+def pad(s: str, width: int) -> str:
+    if cell_width(s) > width:
+        out = ""
+        for c in s:
+            if cell_width(out + c) > width - 1: break
+            out += c
+        s = out + "…"
+    return s + " " * (width - cell_width(s))
+
+def print_table(rows, columns, locale: str):
+    head = HEADERS.get(locale, HEADERS["en"])
+    idx = {"Name": 0, "Id": 1, "Version": 2, "Available": 3, "Source": 4}
+    widths = {"Name": 40, "Id": 34, "Version": 14, "Available": 14, "Source": 8}
+    line = "".join(pad(head[idx[c]], widths[c]) + " " for c in columns).rstrip()
+    print(line)
+    print("-" * cell_width(line))
+    delay = _env_ms("SENSEI_FAKE_ROW_MS")
+    for r in rows:
+        if delay:
+            sys.stdout.flush()
+            time.sleep(delay)
+        print("".join(pad(r.get(c, "") or "", widths[c]) + " " for c in columns).rstrip())
+
+def arg_value(args, *names):
+    for i, a in enumerate(args):
+        if a in names and i + 1 < len(args):
+            return args[i + 1]
+    return None
+
+def progress(label: str):
+    if os.environ.get("SENSEI_FAKE_PROGRESS") != "1":
+        return
+    for i in range(0, 11):
+        bar = "█" * i + "▒" * (10 - i)
+        sys.stdout.write(f"\r  {bar}  {i * 10}%")
+        sys.stdout.flush()
+        time.sleep(_env_ms("SENSEI_FAKE_INSTALL_MS") / 10.0)
+    sys.stdout.write("\n")
+
+def failures() -> dict:
+    out = {}
+    for part in (os.environ.get("SENSEI_FAKE_FAIL") or "").split(","):
+        if "=" in part:
+            k, v = part.split("=", 1)
+            try: out[k.strip()] = int(v)
+            except ValueError: pass
+    return out
+
+def main(argv):
+    time.sleep(_env_ms("SENSEI_FAKE_LATENCY_MS"))
+    locale = os.environ.get("SENSEI_FAKE_LOCALE", "en")
+    if not argv:
+        print("Windows Package Manager (fake)")
+        return 0
+    cmd, args = argv[0], argv[1:]
+    if cmd == "--version":
+        print(os.environ.get("SENSEI_FAKE_VERSION", "v1.7.10861"))
+        return 0
+    if cmd == "source":
+        print("Name    Argument                                      Explicit")
+        print("--------------------------------------------------------------")
+        print("msstore https://storeedgefd.dsx.mp.microsoft.com/v9.0  false")
+        print("winget  https://cdn.winget.microsoft.com/cache         false")
+        return 0
+    if "--output" in args:
+        print("Unrecognized argument: '--output'")
+        return 2
+    with db_lock():
+        db = load_db()
+    pkgs = db["packages"]
+    by_id = {p["Id"]: p for p in pkgs}
+    pid = arg_value(args, "--id")
+    if cmd in ("upgrade", "install") and pid:
+        p = by_id.get(pid)
+        if p is None:
+            print("No installed package found matching input criteria.")
+            return 20
+        time.sleep(_env_ms("SENSEI_FAKE_INSTALL_MS"))
+        code = failures().get(pid)
+        if cmd == "upgrade" and code:
+            print(f"Installer failed with exit code: {code}")
+            return code
+        if cmd == "upgrade" and not p.get("Available"):
+            print("No available upgrade found.")
+            return 43
+        print(f"Found {p['Name']} [{pid}] Version {p.get('Available') or p['Version']}")
+        print("Downloading installer")
+        progress(pid)
+        print("Successfully installed")
+        with db_lock():
+            db = load_db()
+            for q in db["packages"]:
+                if q["Id"] == pid and q.get("Available"):
+                    q["Version"], q["Available"] = q["Available"], ""
+                    save_db(db)
+        return 0
+    if cmd == "upgrade" and "--all" in args:
+        src = arg_value(args, "--source")
+        todo = [p for p in pkgs if p.get("Available") and (not src or p["Source"] == src)]
+        failed = failures()
+        rc = 0
+        for p in todo:
+            time.sleep(_env_ms("SENSEI_FAKE_INSTALL_MS"))
+            print(f"Found {p['Name']} [{p['Id']}] Version {p['Available']}")
+            if p["Id"] in failed:
+                print(f"Installer failed with exit code: {failed[p['Id']]}")
+                rc = failed[p["Id"]]
+                continue
+            progress(p["Id"])
+            print("Successfully installed")
+            with db_lock():
+                db = load_db()
+                for q in db["packages"]:
+                    if q["Id"] == p["Id"]:
+                        q["Version"], q["Available"] = q["Available"], ""
+                save_db(db)
+        return rc
+    if cmd == "upgrade":
+        time.sleep(_env_ms("SENSEI_FAKE_SCAN_MS"))
+        rows = [p for p in pkgs if p.get("Available")]
+        if not rows:
+            print("No installed package found matching input criteria.")
+            return 0
+        print_table(rows, ("Name", "Id", "Version", "Available", "Source"), locale)
+        print(FOOTER.get(locale, FOOTER["en"]).format(n=len(rows)))
+        return 0
+    if cmd == "list":
+        time.sleep(_env_ms("SENSEI_FAKE_SCAN_MS"))
+        src = arg_value(args, "--source")
+        rows = [p for p in pkgs if not pid or p["Id"] == pid]
+        if src: rows = [p for p in rows if p["Source"] == src]
+        if not rows:
+            print("No installed package found matching input criteria.")
+            return 20
+        print_table(rows, ("Name", "Id", "Version", "Available", "Source"), locale)
+        return 0
+    if cmd == "search":
+        time.sleep(_env_ms("SENSEI_FAKE_SCAN_MS"))
+        q = (args[0] if args else "").lower()
+        rows = [{"Name": p["Name"], "Id": p["Id"], "Version": p.get("Available") or p["Version"], "Source": p["Source"]}
+                for p in pkgs if q in p["Name"].lower() or q in p["Id"].lower()]
+        print_table(rows, ("Name", "Id", "Version", "Source"), locale)
+        return 0
+    if cmd == "show":
+        p = by_id.get(pid or "")
+        if p is None:
+            print("No package found matching input criteria.")
+            return 20
+        print(f"Found {p['Name']} [{p['Id']}]")
+        print(f"Version: {p.get('Available') or p['Version']}")
+        print("Installer:")
+        print(f"  Installer Type: {p['InstallerType']}")
+        return 0
+    if cmd == "download":
+        p = by_id.get(pid or "")
+        target = arg_value(args, "--download-directory", "-d")
+        if p is None or not target:
+            return 20
+        time.sleep(_env_ms("SENSEI_FAKE_INSTALL_MS"))
+        d = Path(target)
+        d.mkdir(parents=True, exist_ok=True)
+        (d / f"{p['Id']}.yaml").write_text(f"PackageIdentifier: {p['Id']}\nInstallerType: {p['InstallerType']}\n", encoding="utf-8")
+        (d / "installer.bin").write_bytes(b"\0" * 4096)
+        print(f"Installer downloaded: {d}")
+        return 0
+    print(f"Unrecognized command: '{cmd}'")
+    return 2
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
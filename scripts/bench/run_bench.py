@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+End-to-end throughput benchmarks against the fake winget/pwsh emulators.
+
+Puts `winget` and `pwsh` shims for `fake_winget.py`/`fake_pwsh.py` first on
+PATH, points LOCALAPPDATA at a scratch directory and times the updater's own
+stages. Per-stage timings are written to JSON.
+
+    python scripts/bench/run_bench.py
+    python scripts/bench/run_bench.py --rows 10 100 1000 5000 --runs 5 --out bench-results.json
+"""
+import argparse, contextlib, io, json, os, platform, shutil, statistics, subprocess, sys, tempfile, time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+ROOT = HERE.parents[1]
+sys.path.insert(0, str(HERE))
+import fake_winget
+
+def make_shims(bin_dir: Path):
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    for name, target in (("winget", "fake_winget.py"), ("pwsh", "fake_pwsh.py")):
+        shim = bin_dir / name
+        shim.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{HERE / target}" "$@"\n', encoding="utf-8")
+        shim.chmod(0o755)
+
+def reset_db(rows: int, upgradable: float):
+    fake_winget.save_db(fake_winget.build_db(rows, upgradable))
+
+def table_text(rows: int, locale: str) -> str:
+    db = fake_winget.build_db(rows, 1.0)
+    buf = io.StringIO()
+    with contextlib.redirect_stdout(buf):
+        fake_winget.print_table(db["packages"], ("Name", "Id", "Version", "Available", "Source"), locale)
+        print(fake_winget.FOOTER[locale].format(n=rows))
+    return buf.getvalue()
+
+def timed(fn, runs: int, setup=None):
+    samples = []
+    result = None
+    for _ in range(max(1, runs)):
+        if setup: setup()
+        with contextlib.redirect_stdout(io.StringIO()):
+            t = time.perf_counter()
+            result = fn()
+            samples.append(time.perf_counter() - t)
+    return samples, result
+
+def record(stages, stage: str, samples, **extra):
+    entry = {"stage": stage, "runs": len(samples), "median_s": round(statistics.median(samples), 6),
+             "min_s": round(min(samples), 6), "max_s": round(max(samples), 6)}
+    entry.update(extra)
+    stages.append(entry)
+    detail = " ".join(f"{k}={v}" for k, v in extra.items())
+    print(f"{stage:<24} {detail:<28} median {entry['median_s'] * 1000:9.1f} ms  (min {entry['min_s'] * 1000:.1f})")
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the updater against the fake winget/pwsh emulators.")
+    ap.add_argument("--rows", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--install-count", type=int, default=10)
+    ap.add_argument("--jobs", type=int, nargs="+", default=[1, 4])
+    ap.add_argument("--locale", choices=sorted(fake_winget.HEADERS), default="en")
+    ap.add_argument("--latency-ms", type=float, default=0)
+    ap.add_argument("--install-ms", type=float, default=0)
+    ap.add_argument("--out", type=str, default="bench-results.json")
+    args = ap.parse_args()
+
+    if os.name == "nt":
+        raise SystemExit("The benchmark shims are POSIX shell scripts; run this on Linux or macOS.")
+
+    work = Path(tempfile.mkdtemp(prefix="sensei_bench_"))
+    try:
+        bin_dir = work / "bin"
+        make_shims(bin_dir)
+        db = work / "fake-winget.json"
+        os.environ["PATH"] = str(bin_dir) + os.pathsep + os.environ.get("PATH", "")
+        os.environ["LOCALAPPDATA"] = str(work / "appdata")
+        os.environ["SENSEI_FAKE_DB"] = str(db)
+        os.environ["SENSEI_FAKE_LOCALE"] = args.locale
+        os.environ["SENSEI_FAKE_LATENCY_MS"] = str(args.latency_ms)
+        os.environ["SENSEI_FAKE_INSTALL_MS"] = str(args.install_ms)
+        sys.path.insert(0, str(ROOT / "src"))
+
+        from sensei_updater.core.console import Console
+        from sensei_updater.domain.config import ConfigStore
+        from sensei_updater.services.apps import AppService
+        from sensei_updater.services.wingettable import parse_table_heuristic
+        from sensei_updater.data.paths import CONFIG_DIR
+
+        def clear_state():
+            for name in ("last-upgrades.json", "winget-caps.json"):
+                (CONFIG_DIR / name).unlink(missing_ok=True)
+
+        def new_app():
+            return AppService(console=Console(), cfg=ConfigStore())
+
+        stages = []
+        for rows in args.rows:
+            text = table_text(rows, args.locale)
+            app = new_app()
+            samples, parsed = timed(lambda: app._parse_table(text), max(args.runs, 5))
+            record(stages, "parse_table", samples, rows=rows, parsed=len(parsed))
+            samples, parsed = timed(lambda: parse_table_heuristic(text), max(args.runs, 5))
+            record(stages, "parse_table_heuristic", samples, rows=rows, parsed=len(parsed))
+
+        for rows in args.rows:
+            reset_db(rows, 0.5)
+            samples, found = timed(lambda: new_app().list_upgrades(), args.runs, setup=clear_state)
+            record(stages, "list_upgrades_cold", samples, rows=rows, found=len(found))
+            app = new_app()
+            app.list_upgrades()
+            samples, _ = timed(app.list_upgrades, args.runs)
+            record(stages, "list_upgrades_cached", samples, rows=rows)
+
+        for jobs in args.jobs:
+            def setup():
+                clear_state()
+                reset_db(max(args.install_count * 2, 20), 1.0)
+            def run():
+                app = new_app()
+                ids = [r["Id"] for r in app.list_upgrades() if r.get("Source") != "msstore"][:args.install_count]
+                return app.update_ids(ids, jobs=jobs)
+            samples, res = timed(run, args.runs, setup=setup)
+            record(stages, "update_ids", samples, packages=args.install_count, jobs=jobs, updated=len(res["updated"]))
+
+        def quick():
+            out = work / "quick-report.json"
+            env = dict(os.environ, PYTHONPATH=str(ROOT / "src"))
+            subprocess.run([sys.executable, "-m", "sensei_updater", "--quick", "--yes", "--report", "json", "--out", str(out)],
+                           env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, stdin=subprocess.DEVNULL, check=False)
+        def quick_setup():
+            clear_state()
+            reset_db(100, 0.2)
+        samples, _ = timed(quick, args.runs, setup=quick_setup)
+        record(stages, "quick_flow", samples, rows=100)
+
+        payload = {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "config": {"runs": args.runs, "locale": args.locale, "latency_ms": args.latency_ms, "install_ms": args.install_ms},
+            "stages": stages,
+        }
+        Path(args.out).write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        print(f"Wrote {args.out}")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
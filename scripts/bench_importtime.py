@@ -0,0 +1,94 @@
+"""
+Import-time budget for the CLI entry point.
+
+Runs `python -X importtime` against a CLI path in dry-run mode with a throwaway
+LOCALAPPDATA, sums the cumulative time of every module the run imports after
+interpreter startup, and exits non-zero if the median over several runs is
+above the budget or if a module the path should never load shows up.
+
+    python scripts/bench_importtime.py
+    python scripts/bench_importtime.py --budget-ms 120 --runs 7 -- --apps --yes
+"""
+import argparse, os, re, statistics, subprocess, sys, tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+MARKER = "@@sensei-import-start"
+LINE_RX = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\| ( *)(\S+)")
+
+FORBIDDEN = {
+    ("--apps", "--yes"): [
+        "sensei_updater.ui.menu",
+        "sensei_updater.ui.selector",
+        "sensei_updater.ui.tui",
+        "sensei_updater.services.drivers",
+        "sensei_updater.services.diagnostics",
+        "sensei_updater.services.scheduler",
+    ],
+}
+if os.name != "nt":
+    FORBIDDEN[("--apps", "--yes")].append("ctypes")
+
+PROGRAM = (
+    "import sys; sys.stderr.write('" + MARKER + "\\n'); sys.stderr.flush(); "
+    "sys.argv = ['sensei-updater'] + sys.argv[1:] + ['--dry-run']; "
+    "from sensei_updater.main import main; main()"
+)
+
+def measure(cli_args: list[str]):
+    with tempfile.TemporaryDirectory(prefix="sensei_importtime_") as tmp:
+        env = dict(os.environ)
+        env["LOCALAPPDATA"] = tmp
+        env["PYTHONPATH"] = str(ROOT / "src") + os.pathsep + env.get("PYTHONPATH", "")
+        env["PYTHONDONTWRITEBYTECODE"] = "1"
+        r = subprocess.run([sys.executable, "-X", "importtime", "-c", PROGRAM] + cli_args,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, env=env)
+    lines = r.stderr.splitlines()
+    try:
+        start = lines.index(MARKER) + 1
+    except ValueError:
+        raise SystemExit("importtime marker not found; the program failed to start:\n" + r.stderr[-2000:])
+    total_us = 0
+    modules = []
+    for ln in lines[start:]:
+        m = LINE_RX.match(ln)
+        if not m: continue
+        modules.append(m.group(4))
+        if not m.group(3):
+            total_us += int(m.group(2))
+    return total_us / 1000.0, modules
+
+def main():
+    ap = argparse.ArgumentParser(description="Cold-import budget check for the CLI entry point.")
+    ap.add_argument("--budget-ms", type=float, default=float(os.environ.get("SENSEI_IMPORT_BUDGET_MS", 200)))
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("cli", nargs="*", default=["--apps", "--yes"])
+    args = ap.parse_args()
+
+    samples = []
+    modules = []
+    for _ in range(max(1, args.runs)):
+        ms, modules = measure(args.cli)
+        samples.append(ms)
+    median = statistics.median(samples)
+    own = sorted(m for m in set(modules) if m.startswith("sensei_updater"))
+    print(f"path: {' '.join(args.cli)}")
+    print(f"samples (ms): {', '.join(f'{s:.1f}' for s in samples)}")
+    print(f"median: {median:.1f} ms   budget: {args.budget_ms:.1f} ms")
+    print(f"sensei_updater modules ({len(own)}): {', '.join(own)}")
+
+    failed = False
+    loaded = set(modules)
+    bad = [m for m in FORBIDDEN.get(tuple(args.cli), []) if m in loaded]
+    if bad:
+        print(f"FAIL: path imported modules it does not use: {', '.join(bad)}")
+        failed = True
+    if median > args.budget_ms:
+        print(f"FAIL: median cold import {median:.1f} ms exceeds budget {args.budget_ms:.1f} ms")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
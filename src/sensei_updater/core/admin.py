@@ -1,8 +1,10 @@
-import os, ctypes
+import os
 
 def is_admin() -> bool:
     if os.name != "nt": return False
-    try: return bool(ctypes.windll.shell32.IsUserAnAdmin())
+    try:
+        import ctypes
+        return bool(ctypes.windll.shell32.IsUserAnAdmin())
     except Exception: return False
 
 def require_admin_or_msg(console, name: str) -> bool:
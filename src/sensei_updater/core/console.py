@@ -1,4 +1,4 @@
-import os, ctypes, sys, io
+import os, sys, io
 from datetime import datetime
 from .colors import *
 from ..data.paths import KO_FI_URL, LOG_DIR
@@ -12,6 +12,7 @@ class Console:
     def enable_windows_ansi_utf8(self):
         if os.name == "nt":
             try:
+                import ctypes
                 k32 = ctypes.windll.kernel32
                 hOut = k32.GetStdHandle(-11)
                 mode = ctypes.c_uint32()
@@ -43,6 +44,7 @@ class Console:
     def is_admin(self) -> bool:
         if os.name != "nt": return False
         try:
+            import ctypes
             return bool(ctypes.windll.shell32.IsUserAnAdmin())
         except Exception:
             return False
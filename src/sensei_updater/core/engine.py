@@ -0,0 +1,195 @@
+import asyncio, codecs, os, queue, signal, subprocess, threading
+from .resources import Meter
+
+class RunResult:
+    def __init__(self, rc: int, out: str, timed_out: bool=False, cancelled: bool=False, pid: int | None=None):
+        self.rc = rc
+        self.out = out
+        self.timed_out = timed_out
+        self.cancelled = cancelled
+        self.pid = pid
+        self.duration_s = None
+        self.usage = None
+
+class LineBuffer:
+    """Splits a decoded stream into segments ending in `\\n` or a bare `\\r`."""
+    def __init__(self):
+        self._buf = ""
+
+    def feed(self, text: str) -> list[str]:
+        self._buf += text
+        parts = []
+        start = 0
+        i = 0
+        n = len(self._buf)
+        while i < n:
+            ch = self._buf[i]
+            if ch == "\n" or (ch == "\r" and i + 1 < n and self._buf[i+1] != "\n"):
+                parts.append(self._buf[start:i+1])
+                start = i + 1
+            i += 1
+        self._buf = self._buf[start:]
+        return parts
+
+    def flush(self) -> str:
+        rest, self._buf = self._buf, ""
+        return rest
+
+def kill_tree(pid: int):
+    if os.name == "nt":
+        try:
+            subprocess.run(["taskkill","/PID",str(pid),"/T","/F"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except Exception:
+            pass
+    else:
+        try: os.killpg(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError, OSError): pass
+
+class ProcessEngine:
+    """Runs child processes on a private asyncio loop in one daemon thread."""
+    _default = None
+    _default_lock = threading.Lock()
+    EXIT_GRACE_S = 0.5
+
+    def __init__(self):
+        self.loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def default(cls):
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self.loop.run_forever, name="process-engine", daemon=True)
+                self._thread.start()
+        return self.loop
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    async def run(self, cmd, on_text=None, on_idle=None, timeout: float | None=None, idle_timeout: float | None=None,
+                  tick: float=0.1, merge_stderr: bool=True, stdin=None) -> RunResult:
+        kw = {}
+        if os.name == "nt":
+            kw["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            kw["start_new_session"] = True
+        proc = await asyncio.create_subprocess_exec(
+            *map(str, cmd), stdin=stdin, stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT if merge_stderr else asyncio.subprocess.DEVNULL, **kw)
+        meter = Meter(proc.pid)
+        t0 = asyncio.get_running_loop().time()
+        try:
+            r = await self._pump(proc, meter, on_text, on_idle, timeout, idle_timeout, tick)
+        finally:
+            usage = meter.finish()
+        r.usage = usage
+        r.duration_s = asyncio.get_running_loop().time() - t0
+        return r
+
+    async def _pump(self, proc, meter, on_text, on_idle, timeout, idle_timeout, tick) -> RunResult:
+        loop = asyncio.get_running_loop()
+        dec = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        out = []
+        def emit(text):
+            if not text: return
+            out.append(text)
+            if on_text: on_text(text)
+        start = last = loop.time()
+        exited_at = None
+        timed_out = False
+        reader = None
+        try:
+            while True:
+                if reader is None:
+                    reader = asyncio.ensure_future(proc.stdout.read(65536))
+                done, _ = await asyncio.wait({reader}, timeout=tick)
+                now = loop.time()
+                meter.sample(now)
+                if reader in done:
+                    data = reader.result()
+                    reader = None
+                    if not data:
+                        meter.sample(now, force=True)
+                        break
+                    emit(dec.decode(data))
+                    last = now
+                    continue
+                if proc.returncode is not None:
+                    if exited_at is None:
+                        exited_at = now
+                    elif now - exited_at >= self.EXIT_GRACE_S:
+                        break
+                if (timeout and now - start >= timeout) or (idle_timeout and now - last >= idle_timeout):
+                    timed_out = True
+                    break
+                if on_idle:
+                    on_idle(now - last)
+        except asyncio.CancelledError:
+            kill_tree(proc.pid)
+            if reader: reader.cancel()
+            raise
+        if reader and not reader.done():
+            reader.cancel()
+        emit(dec.decode(b"", final=True))
+        if not timed_out and proc.returncode is None and timeout:
+            try:
+                await asyncio.wait_for(asyncio.shield(proc.wait()), max(0.0, timeout - (loop.time() - start)))
+            except asyncio.TimeoutError:
+                timed_out = True
+        if timed_out:
+            kill_tree(proc.pid)
+            try:
+                await asyncio.wait_for(proc.wait(), 5)
+            except (asyncio.TimeoutError, Exception):
+                pass
+            return RunResult(124, "".join(out), timed_out=True, pid=proc.pid)
+        if proc.returncode is None:
+            await proc.wait()
+        else:
+            transport = getattr(proc, "_transport", None)
+            if transport is not None:
+                transport.close()
+        return RunResult(proc.returncode, "".join(out), pid=proc.pid)
+
+    def iter_run(self, cmd, **kw):
+        """Yields output chunks as they arrive and returns the RunResult; closing it early kills the child."""
+        q = queue.Queue()
+        fut = self.submit(self.run(cmd, on_text=q.put, **kw))
+        fut.add_done_callback(lambda f: q.put(None))
+        try:
+            while True:
+                chunk = q.get()
+                if chunk is None: break
+                yield chunk
+        except KeyboardInterrupt:
+            self._interrupt(fut)
+            raise
+        finally:
+            if not fut.done():
+                fut.cancel()
+        try:
+            return fut.result()
+        except Exception:
+            return RunResult(1, "", cancelled=True)
+
+    def run_sync(self, cmd, **kw) -> RunResult:
+        fut = self.submit(self.run(cmd, **kw))
+        try:
+            return fut.result()
+        except KeyboardInterrupt:
+            self._interrupt(fut)
+            raise
+
+    def _interrupt(self, fut):
+        done = threading.Event()
+        fut.cancel()
+        self.loop.call_soon_threadsafe(self.loop.call_soon, done.set)
+        done.wait(5)
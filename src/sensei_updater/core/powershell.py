@@ -1,5 +1,7 @@
-import os, tempfile
+import os, threading, subprocess, base64, atexit, json, time
+from . import resources, trace
 from .process import Process
+from .colors import MAGENTA, DIM, RESET, GRAY
 
 PS_PREFIX = r'''
 $ErrorActionPreference = "Stop"
@@ -9,12 +11,171 @@ $OutputEncoding = [System.Text.UTF8Encoding]::new()
 [Net.ServicePointManager]::SecurityProtocol = [Net.SecurityProtocolType]::Tls12
 '''
 
+SENTINEL = "<<<SENSEI-END:"
+
+HOST_LOOP = PS_PREFIX + r'''
+while ($true) {
+  $line = [Console]::In.ReadLine()
+  if ($null -eq $line) { break }
+  $parts = $line.Split(" ", 2)
+  if ($parts.Count -lt 2) { continue }
+  $token = $parts[0]
+  $code = [System.Text.Encoding]::UTF8.GetString([Convert]::FromBase64String($parts[1]))
+  $rc = 0
+  try {
+    & ([ScriptBlock]::Create($code)) 2>&1 | Out-String -Stream -Width 4096 | ForEach-Object { [Console]::Out.WriteLine($_) }
+  } catch {
+    [Console]::Out.WriteLine($_.Exception.Message)
+    $rc = 1
+  }
+  [Console]::Out.WriteLine("<<<SENSEI-END:" + $token + ":" + $rc + ">>>")
+  [Console]::Out.Flush()
+}
+'''
+
+EVENT_PREFIX = "@@sensei "
+
+EVENT_PS = r'''
+function Send-SenseiEvent([string]$Type, $Data = @{}) {
+  $e = [ordered]@{ event = $Type }
+  foreach ($k in $Data.Keys) { $e[$k] = $Data[$k] }
+  Write-Output ("@@sensei " + ($e | ConvertTo-Json -Compress -Depth 6))
+}
+'''
+
+def parse_event(line: str):
+    s = line.strip()
+    if not s.startswith(EVENT_PREFIX): return None
+    try:
+        ev = json.loads(s[len(EVENT_PREFIX):])
+    except ValueError:
+        return None
+    return ev if isinstance(ev, dict) and ev.get("event") else None
+
+def events_of(events, kind: str) -> list:
+    return [e for e in events if e.get("event") == kind]
+
+def result_of(events) -> dict:
+    found = events_of(events, "result")
+    return {k: v for k, v in found[-1].items() if k != "event"} if found else {}
+
+def ps_executable() -> str:
+    return "powershell.exe" if os.name == "nt" else "pwsh"
+
+class PowerShellSession:
+    """One long-lived PowerShell host fed through stdin; a host that dies mid-request is restarted on the next call."""
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, exe: str):
+        self.exe = exe
+        self._p = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, exe: str):
+        with cls._shared_lock:
+            s = cls._shared.get(exe)
+            if s is None:
+                s = cls._shared[exe] = cls(exe)
+            return s
+
+    @classmethod
+    def close_all(cls):
+        with cls._shared_lock:
+            sessions = list(cls._shared.values())
+            cls._shared.clear()
+        for s in sessions:
+            s.close()
+
+    @property
+    def pid(self):
+        p = self._p
+        return p.pid if p is not None else None
+
+    def alive(self) -> bool:
+        return self._p is not None and self._p.poll() is None
+
+    def start(self):
+        if self.alive(): return
+        self.close()
+        encoded = base64.b64encode(HOST_LOOP.encode("utf-16-le")).decode("ascii")
+        self._p = subprocess.Popen(
+            [self.exe, "-NoLogo","-NoProfile","-NonInteractive","-ExecutionPolicy","Bypass","-EncodedCommand", encoded],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            text=True, encoding="utf-8", errors="replace", bufsize=1, shell=False)
+
+    def execute(self, script: str, on_line=None) -> tuple[int,str]:
+        with self._lock:
+            self.start()
+            p = self._p
+            token = os.urandom(8).hex()
+            marker = f"{SENTINEL}{token}:"
+            payload = base64.b64encode(script.encode("utf-8")).decode("ascii")
+            out = []
+            try:
+                p.stdin.write(f"{token} {payload}\n")
+                p.stdin.flush()
+            except (OSError, ValueError):
+                rc = p.poll()
+                self.close()
+                return (rc if rc not in (None, 0) else 1), ""
+            while True:
+                line = p.stdout.readline()
+                if not line:
+                    rc = p.wait()
+                    self._p = None
+                    return (rc if rc else 1), "".join(out)
+                idx = line.find(marker)
+                if idx >= 0:
+                    head = line[:idx]
+                    if head:
+                        out.append(head + "\n")
+                        if on_line: on_line(head + "\n")
+                    status = line[idx + len(marker):].strip().rstrip(">")
+                    try: rc = int(status)
+                    except ValueError: rc = 1
+                    return rc, "".join(out)
+                out.append(line)
+                if on_line: on_line(line)
+
+    def close(self):
+        p, self._p = self._p, None
+        if p is None: return
+        try:
+            if p.stdin: p.stdin.close()
+        except Exception:
+            pass
+        try:
+            p.wait(timeout=3)
+        except Exception:
+            try: p.kill()
+            except Exception: pass
+
+atexit.register(PowerShellSession.close_all)
+
+def _first_line(script: str) -> str:
+    return next((ln.strip() for ln in script.splitlines() if ln.strip()), "")
+
+def _print_line(line: str):
+    if line.strip().startswith("VERBOSE:"):
+        print(f"{GRAY}{line.rstrip()}{RESET}")
+    else:
+        print(line, end="")
+
 class PowerShell:
-    def __init__(self, proc: Process):
+    def __init__(self, proc: Process, session: PowerShellSession | None=None):
         self.proc = proc
-        self.exe = "powershell.exe" if os.name == "nt" else "pwsh"
+        self.exe = ps_executable()
+        self.session = session
 
-    def run(self, script: str) -> int:
+    def _session(self):
+        if self.session is None:
+            self.session = PowerShellSession.shared(self.exe)
+        return self.session
+
+    def _run_file(self, script: str) -> int:
+        import tempfile
         full = PS_PREFIX + "\n" + script
         with tempfile.NamedTemporaryFile(delete=False, suffix=".ps1", mode="w", encoding="utf-8") as f:
             f.write(full); path = f.name
@@ -22,4 +183,65 @@ class PowerShell:
             return self.proc.run_stream([self.exe, "-NoLogo","-NoProfile","-NonInteractive","-ExecutionPolicy","Bypass","-File", path])
         finally:
             try: os.remove(path)
-            except Exception: pass
\ No newline at end of file
+            except Exception: pass
+
+    def _debug(self, script: str):
+        if self.proc.debug:
+            print(f"{MAGENTA}{DIM}>>> [{self.exe} session] {_first_line(script)}{RESET}")
+
+    def _execute(self, script: str, on_line=None, label: str | None=None) -> tuple[int,str]:
+        session = self._session()
+        prov = resources.provider()
+        pid0 = session.pid
+        before = prov.sample(pid0) if pid0 else None
+        t = time.perf_counter()
+        with trace.span(f"{self.exe} session", "process", script=label or _first_line(script)) as args:
+            rc, out = session.execute(script, on_line=on_line)
+            pid = session.pid
+            usage = resources.delta(before if pid == pid0 else None, prov.sample(pid)) if pid else None
+            if args is not None: args.update(pid=pid, rc=rc, **(usage or {}))
+        resources.record(f"{self.exe} session", pid, rc, time.perf_counter() - t, usage)
+        return rc, out
+
+    def run(self, script: str) -> int:
+        if self.proc.dry_run:
+            return self._run_file(script)
+        self._debug(script)
+        try:
+            rc, _ = self._execute(script, on_line=_print_line)
+            return rc
+        except OSError:
+            return self._run_file(script)
+
+    def run_capture(self, script: str) -> tuple[int,str]:
+        if self.proc.dry_run:
+            return 0, ""
+        self._debug(script)
+        try:
+            return self._execute(script)
+        except OSError:
+            full = PS_PREFIX + "\n" + script
+            return self.proc.run_capture([self.exe, "-NoLogo","-NoProfile","-NonInteractive","-ExecutionPolicy","Bypass","-Command", full])
+
+    def events(self, script: str, progress=None, on_event=None, echo: bool=True) -> tuple[int,list]:
+        """Runs a script that reports through `Send-SenseiEvent` and returns (rc, events)."""
+        body = EVENT_PS + "try {\n" + script + "\n} catch {\n  Send-SenseiEvent error @{ message = $_.Exception.Message }\n  throw\n}\n"
+        events = []
+        def on_line(line: str):
+            ev = parse_event(line)
+            if ev is None:
+                if echo and line.strip(): _print_line(line)
+                return
+            events.append(ev)
+            if progress and ev["event"] == "progress" and ev.get("message"): progress(ev["message"])
+            if on_event: on_event(ev)
+        if self.proc.dry_run:
+            self._run_file(body)
+            return 0, events
+        self._debug(script)
+        try:
+            rc, _ = self._execute(body, on_line=on_line, label=_first_line(script))
+        except OSError:
+            rc, out = self.proc.run_capture([self.exe, "-NoLogo","-NoProfile","-NonInteractive","-ExecutionPolicy","Bypass","-Command", PS_PREFIX + "\n" + body])
+            for ln in (out or "").splitlines(): on_line(ln + "\n")
+        return rc, events
@@ -1,93 +1,85 @@
-import subprocess, sys, time
+import asyncio, sys
+from . import resources, trace
 from .colors import MAGENTA, DIM, RESET, GRAY
+from .engine import ProcessEngine, LineBuffer, RunResult
 
 class Process:
-    def __init__(self, debug: bool=False, dry_run: bool=False):
+    def __init__(self, debug: bool=False, dry_run: bool=False, engine: ProcessEngine | None=None):
         self.debug = debug
         self.dry_run = dry_run
+        self.engine = engine or ProcessEngine.default()
+
+    def _run(self, cmd, **kw) -> RunResult:
+        if not trace.active():
+            r = self.engine.run_sync(cmd, **kw)
+        else:
+            with trace.span(trace.command_kind(cmd), "process", cmd=" ".join(map(str, cmd))) as args:
+                r = self.engine.run_sync(cmd, **kw)
+                args.update(pid=r.pid, rc=r.rc, timed_out=r.timed_out, **(r.usage or {}))
+        resources.record(trace.command_kind(cmd), r.pid, r.rc, r.duration_s, r.usage)
+        return r
 
     def run_stream(self, cmd: list[int|str]) -> int:
         if self.debug: print(f"{MAGENTA}{DIM}>>> {' '.join(map(str,cmd))}{RESET}")
         if self.dry_run:
             print(f"{GRAY}[dry-run]{RESET} {' '.join(map(str,cmd))}")
             return 0
-        try:
-            p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding="utf-8", errors="replace", shell=False)
-            assert p.stdout is not None
-            for line in p.stdout:
-                if line.strip().startswith("VERBOSE:"):
-                    print(f"{GRAY}{line.rstrip()}{RESET}")
-                else:
-                    print(line, end="")
-            return p.wait()
-        except KeyboardInterrupt:
-            try: p.terminate()
-            except Exception: pass
-            return 1
+        buf = LineBuffer()
+        def show(seg):
+            if seg.strip().startswith("VERBOSE:"):
+                print(f"{GRAY}{seg.rstrip()}{RESET}")
+            else:
+                print(seg, end="", flush=True)
+        def on_text(text):
+            for seg in buf.feed(text): show(seg)
+        r = self._run(cmd, on_text=on_text)
+        rest = buf.flush()
+        if rest: show(rest + "\n")
+        return r.rc
 
     def run_capture(self, cmd: list[int|str]) -> tuple[int,str]:
         if self.debug: print(f"{MAGENTA}{DIM}>>> {' '.join(map(str,cmd))}{RESET}")
         if self.dry_run: return 0, ""
-        r = subprocess.run(cmd, capture_output=True, text=True, encoding="utf-8", errors="replace", shell=False)
-        return r.returncode, r.stdout
+        r = self._run(cmd, merge_stderr=False, stdin=asyncio.subprocess.DEVNULL)
+        return r.rc, r.out
 
-    def run_capture_timeout(self, cmd: list[int|str], timeout_s: float) -> tuple[int,str,bool]:
+    def run_capture_timeout(self, cmd: list[int|str], timeout_s: float, idle_timeout_s: float | None=None) -> tuple[int,str,bool]:
         if self.debug: print(f"{MAGENTA}{DIM}>>> {' '.join(map(str,cmd))}{RESET}")
         if self.dry_run: return 0, "", False
-        start = time.time()
-        p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding="utf-8", errors="replace", shell=False)
-        out = []
-        try:
-            while True:
-                if p.poll() is not None:
-                    break
-                if time.time() - start > timeout_s:
-                    try: p.terminate()
-                    except Exception: pass
-                    return 124, "".join(out), True
-                chunk = p.stdout.readline() if p.stdout else ""
-                if chunk:
-                    out.append(chunk)
-                else:
-                    time.sleep(0.05)
-        finally:
-            try:
-                rc = p.wait(timeout=1)
-            except Exception:
-                rc = 124
-        return rc, "".join(out), False
+        r = self._run(cmd, timeout=timeout_s, idle_timeout=idle_timeout_s, stdin=asyncio.subprocess.DEVNULL)
+        return r.rc, r.out, r.timed_out
+
+    def iter_capture(self, cmd: list[int|str], timeout_s: float | None=None, idle_timeout_s: float | None=None):
+        if self.debug: print(f"{MAGENTA}{DIM}>>> {' '.join(map(str,cmd))}{RESET}")
+        if self.dry_run: return RunResult(0, "")
+        gen = self.engine.iter_run(cmd, timeout=timeout_s, idle_timeout=idle_timeout_s, stdin=asyncio.subprocess.DEVNULL)
+        if not trace.active():
+            r = yield from gen
+        else:
+            with trace.span(trace.command_kind(cmd), "process", cmd=" ".join(map(str, cmd)), streamed=True) as args:
+                r = yield from gen
+                args.update(pid=r.pid, rc=r.rc, timed_out=r.timed_out, **(r.usage or {}))
+        resources.record(trace.command_kind(cmd), r.pid, r.rc, r.duration_s, r.usage)
+        return r
 
     def run_stream_progress(self, cmd: list[int|str], label: str, idle_anim: str="|/-\\", idle_tick: float=0.1, idle_after: float=1.0) -> int:
         if self.debug: print(f"{MAGENTA}{DIM}>>> {' '.join(map(str,cmd))}{RESET}")
         if self.dry_run:
             print(f"{GRAY}[dry-run]{RESET} {label}")
             return 0
-        p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, encoding="utf-8", errors="replace", shell=False)
-        assert p.stdout is not None
-        last = time.time()
-        frame = 0
+        frame = [0]
+        def on_text(text):
+            sys.stdout.write(text)
+            sys.stdout.flush()
+        def on_idle(idle):
+            if idle >= idle_after:
+                ch = idle_anim[frame[0] % len(idle_anim)]
+                sys.stdout.write(f"\r{label} {ch}")
+                sys.stdout.flush()
+                frame[0] += 1
         try:
-            while True:
-                line = p.stdout.readline()
-                if line:
-                    print(line, end="")
-                    last = time.time()
-                else:
-                    if p.poll() is not None:
-                        break
-                    if time.time() - last >= idle_after:
-                        ch = idle_anim[frame % len(idle_anim)]
-                        sys.stdout.write(f"\r{label} {ch}")
-                        sys.stdout.flush()
-                        frame += 1
-                        time.sleep(idle_tick)
-                    else:
-                        time.sleep(0.05)
+            r = self._run(cmd, on_text=on_text, on_idle=on_idle, tick=idle_tick)
         finally:
-            try:
-                rc = p.wait(timeout=1)
-            except Exception:
-                rc = 1
             sys.stdout.write("\r" + " " * (len(label) + 2) + "\r")
             sys.stdout.flush()
-        return rc
\ No newline at end of file
+        return r.rc
@@ -0,0 +1,225 @@
+import collections, os, threading, time
+from datetime import datetime
+
+FIELDS = ("cpu_user_s", "cpu_sys_s", "peak_rss_kb", "read_bytes", "write_bytes")
+LEDGER_MAX = 10000
+
+class NullProvider:
+    name = "none"
+
+    def sample(self, pid: int):
+        return None
+
+    def children(self):
+        return None
+
+class ProcProvider:
+    name = "proc"
+
+    def __init__(self):
+        self._tick = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+    def sample(self, pid: int):
+        try:
+            with open(f"/proc/{pid}/stat", "rb") as f:
+                stat = f.read().rsplit(b")", 1)[1].split()
+        except (OSError, IndexError):
+            return None
+        out = dict.fromkeys(FIELDS)
+        out["cpu_user_s"] = (int(stat[11]) + int(stat[13])) / self._tick
+        out["cpu_sys_s"] = (int(stat[12]) + int(stat[14])) / self._tick
+        try:
+            with open(f"/proc/{pid}/status", "rb") as f:
+                for ln in f:
+                    if ln.startswith(b"VmHWM:"):
+                        out["peak_rss_kb"] = int(ln.split()[1])
+                        break
+        except (OSError, ValueError, IndexError):
+            pass
+        try:
+            with open(f"/proc/{pid}/io", "rb") as f:
+                io = dict(ln.split(b":", 1) for ln in f if b":" in ln)
+            out["read_bytes"] = int(io[b"rchar"])
+            out["write_bytes"] = int(io[b"wchar"])
+        except (OSError, ValueError, KeyError):
+            pass
+        return out
+
+    def children(self):
+        import resource
+        ru = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return {"cpu_user_s": ru.ru_utime, "cpu_sys_s": ru.ru_stime, "peak_rss_kb": ru.ru_maxrss,
+                "read_bytes": ru.ru_inblock * 512, "write_bytes": ru.ru_oublock * 512}
+
+class WindowsProvider:
+    name = "win32"
+    PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+        self._ct, self._wt = ctypes, wintypes
+        self._k32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        self._k32.OpenProcess.restype = wintypes.HANDLE
+        self._k32.OpenProcess.argtypes = (wintypes.DWORD, wintypes.BOOL, wintypes.DWORD)
+
+        class MEMORY(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        class IO(ctypes.Structure):
+            _fields_ = [(n, ctypes.c_ulonglong) for n in ("ReadOperationCount", "WriteOperationCount", "OtherOperationCount",
+                                                          "ReadTransferCount", "WriteTransferCount", "OtherTransferCount")]
+        self._MEMORY, self._IO = MEMORY, IO
+
+    def sample(self, pid: int):
+        ct, k32 = self._ct, self._k32
+        raw = k32.OpenProcess(self.PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not raw:
+            return None
+        h = self._wt.HANDLE(raw)
+        try:
+            out = dict.fromkeys(FIELDS)
+            ft = [ct.c_ulonglong() for _ in range(4)]
+            if k32.GetProcessTimes(h, *(ct.byref(x) for x in ft)):
+                out["cpu_sys_s"] = ft[2].value / 1e7
+                out["cpu_user_s"] = ft[3].value / 1e7
+            mem = self._MEMORY()
+            mem.cb = ct.sizeof(mem)
+            if k32.K32GetProcessMemoryInfo(h, ct.byref(mem), mem.cb):
+                out["peak_rss_kb"] = mem.PeakWorkingSetSize // 1024
+            io = self._IO()
+            if k32.GetProcessIoCounters(h, ct.byref(io)):
+                out["read_bytes"] = io.ReadTransferCount
+                out["write_bytes"] = io.WriteTransferCount
+            return out
+        finally:
+            k32.CloseHandle(h)
+
+    def children(self):
+        return None
+
+_provider = None
+_provider_lock = threading.Lock()
+
+def provider():
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            try:
+                if os.name == "nt":
+                    _provider = WindowsProvider()
+                elif os.path.isdir("/proc/self"):
+                    _provider = ProcProvider()
+            except Exception:
+                _provider = None
+            _provider = _provider or NullProvider()
+        return _provider
+
+def set_provider(p):
+    global _provider
+    with _provider_lock:
+        _provider = p
+
+def delta(before, after):
+    if after is None: return None
+    if before is None: return dict(after)
+    out = {}
+    for k in FIELDS:
+        a, b = after.get(k), before.get(k)
+        out[k] = a if k == "peak_rss_kb" or a is None or b is None else a - b
+    return out
+
+_running = 0
+_epoch = 0
+_count_lock = threading.Lock()
+
+class Meter:
+    """Samples one child while it runs; when it ran alone, the reaped-children totals replace its CPU times."""
+    SAMPLE_S = 0.2
+
+    def __init__(self, pid: int):
+        global _running, _epoch
+        self.pid = pid
+        self.prov = provider()
+        with _count_lock:
+            _running += 1
+            _epoch += 1
+            self._alone = _running == 1
+            self._epoch = _epoch
+        self._base = self._children()
+        self._last = None
+        self._at = 0.0
+
+    def _children(self):
+        try:
+            return self.prov.children()
+        except Exception:
+            return None
+
+    def sample(self, now: float | None=None, force: bool=False):
+        now = time.monotonic() if now is None else now
+        if not force and now - self._at < self.SAMPLE_S: return
+        self._at = now
+        try:
+            s = self.prov.sample(self.pid)
+        except Exception:
+            s = None
+        if s and self._last:
+            s = {k: (self._last.get(k) if s.get(k) is None else s[k]) for k in FIELDS}
+        if s: self._last = s
+
+    def finish(self):
+        global _running
+        with _count_lock:
+            _running -= 1
+            alone = self._alone and self._epoch == _epoch
+        usage = dict(self._last) if self._last else dict.fromkeys(FIELDS)
+        after = self._children() if alone and self._base else None
+        if after:
+            d = delta(self._base, after)
+            usage["cpu_user_s"], usage["cpu_sys_s"] = d["cpu_user_s"], d["cpu_sys_s"]
+            if after["peak_rss_kb"] > self._base["peak_rss_kb"] and not usage.get("peak_rss_kb"):
+                usage["peak_rss_kb"] = after["peak_rss_kb"]
+            for k in ("read_bytes", "write_bytes"):
+                if usage.get(k) is None: usage[k] = d[k]
+        if all(usage.get(k) is None for k in FIELDS):
+            return None
+        return {k: (round(v, 3) if isinstance(v, float) else v) for k, v in usage.items()}
+
+_ledger = collections.deque(maxlen=LEDGER_MAX)
+_seq = 0
+_ledger_lock = threading.Lock()
+
+def record(kind: str, pid, rc, duration_s, usage):
+    global _seq
+    entry = {"ts": datetime.utcnow().isoformat() + "Z", "kind": kind, "pid": pid, "rc": rc,
+             "duration_s": round(duration_s, 3) if duration_s is not None else None,
+             "tid": threading.get_ident(), **(usage or dict.fromkeys(FIELDS))}
+    with _ledger_lock:
+        _seq += 1
+        entry["seq"] = _seq
+        _ledger.append(entry)
+
+def mark() -> int:
+    with _ledger_lock:
+        return _seq
+
+def since(seq: int, until: int | None=None, tid: int | None=None):
+    with _ledger_lock:
+        return [dict(e) for e in _ledger if e["seq"] > seq and (until is None or e["seq"] <= until) and (tid is None or e["tid"] == tid)]
+
+def aggregate(entries) -> dict:
+    out = {"commands": len(entries)}
+    for k in FIELDS:
+        vals = [e[k] for e in entries if e.get(k) is not None]
+        if not vals:
+            out[k] = None
+        elif k == "peak_rss_kb":
+            out[k] = max(vals)
+        else:
+            out[k] = round(sum(vals), 3) if isinstance(vals[0], float) else sum(vals)
+    return out
@@ -0,0 +1,101 @@
+import contextlib, contextvars, functools, json, os, threading, time
+from pathlib import Path
+
+_tracer = None
+_tags = contextvars.ContextVar("sensei_trace_tags", default=None)
+_NULL = contextlib.nullcontext()
+
+class Tracer:
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.pid = os.getpid()
+        self.events = []
+        self._threads = {}
+        self._lock = threading.Lock()
+
+    def now_us(self) -> float:
+        return (time.perf_counter() - self.t0) * 1e6
+
+    def add(self, name: str, cat: str, start_us: float, args: dict):
+        tid = threading.get_ident()
+        ev = {"name": name, "cat": cat, "ph": "X", "ts": round(start_us, 1), "dur": round(self.now_us() - start_us, 1),
+              "pid": self.pid, "tid": tid, "args": args}
+        with self._lock:
+            if tid not in self._threads:
+                self._threads[tid] = threading.current_thread().name
+            self.events.append(ev)
+
+    def to_json(self) -> str:
+        with self._lock:
+            meta = [{"name": "process_name", "ph": "M", "pid": self.pid, "tid": 0, "args": {"name": "sensei-updater"}}]
+            meta += [{"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": name}} for tid, name in self._threads.items()]
+            events = meta + sorted(self.events, key=lambda e: e["ts"])
+        return json.dumps({"traceEvents": events, "displayTimeUnit": "ms"})
+
+def start() -> Tracer:
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+def stop(path: Path | None=None):
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is not None and path is not None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(tracer.to_json(), encoding="utf-8")
+    return tracer
+
+def active() -> bool:
+    return _tracer is not None
+
+@contextlib.contextmanager
+def _span(tracer: Tracer, name: str, cat: str, args: dict):
+    tags = _tags.get()
+    if tags: args = {**tags, **args}
+    start_us = tracer.now_us()
+    try:
+        yield args
+    finally:
+        tracer.add(name, cat, start_us, args)
+
+def span(name: str, cat: str="service", **args):
+    """Yields the span's args dict for the caller to add results to, or None when tracing is off."""
+    tracer = _tracer
+    if tracer is None:
+        return _NULL
+    return _span(tracer, name, cat, args)
+
+@contextlib.contextmanager
+def _tagged(kv: dict):
+    token = _tags.set({**(_tags.get() or {}), **kv})
+    try:
+        yield
+    finally:
+        _tags.reset(token)
+
+def tag(**kv):
+    if _tracer is None:
+        return _NULL
+    return _tagged(kv)
+
+def traced(name: str | None=None, cat: str="service"):
+    def wrap(fn):
+        label = name or fn.__name__
+        @functools.wraps(fn)
+        def inner(*a, **kw):
+            if _tracer is None:
+                return fn(*a, **kw)
+            with _span(_tracer, label, cat, {}):
+                return fn(*a, **kw)
+        return inner
+    return wrap
+
+def command_kind(cmd) -> str:
+    if not cmd: return ""
+    exe = os.path.basename(str(cmd[0])).rsplit(".", 1)[0].lower()
+    rest = [str(c) for c in cmd[1:]]
+    if exe in ("pwsh", "powershell"):
+        sub = next((c for c in rest if c in ("-File", "-Command", "-EncodedCommand")), "")
+    else:
+        sub = next((c for c in rest if not c.startswith("-")), "")
+    return f"{exe} {sub}".strip()
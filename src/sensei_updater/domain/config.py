@@ -19,7 +19,22 @@ class ConfigStore:
                 "report": "json",
                 "out": "%LOCALAPPDATA%\\SenseiUpdater\\last-run.json",
                 "prefer_tui": False,
-                "cache_ttl_minutes": 15
+                "cache_ttl_minutes": 15,
+                "cache_max_age_minutes": 240,
+                "inventory_ttl_minutes": 60,
+                "pipeline_downloads": False,
+                "prefetch_depth": 2,
+                "prefetch_workers": 2,
+                "prefetch_disk_cap_mb": 4096,
+                "install_jobs": 1,
+                "batch_upgrades": False,
+                "in_use_retry_seconds": 20,
+                "strategy_retest_days": 14,
+                "driver_scan_ttl_minutes": 120,
+                "pswindowsupdate_stamp_days": 7,
+                "temp_min_age_hours": 0,
+                "cleanup_workers": 8,
+                "probe_ttl_minutes": 30
             }
         }
 
@@ -74,6 +89,21 @@ class ConfigStore:
         d.setdefault("out", "%LOCALAPPDATA%\\SenseiUpdater\\last-run.json")
         d.setdefault("prefer_tui", False)
         d.setdefault("cache_ttl_minutes", 15)
+        d.setdefault("cache_max_age_minutes", 240)
+        d.setdefault("inventory_ttl_minutes", 60)
+        d.setdefault("pipeline_downloads", False)
+        d.setdefault("prefetch_depth", 2)
+        d.setdefault("prefetch_workers", 2)
+        d.setdefault("prefetch_disk_cap_mb", 4096)
+        d.setdefault("install_jobs", 1)
+        d.setdefault("batch_upgrades", False)
+        d.setdefault("in_use_retry_seconds", 20)
+        d.setdefault("strategy_retest_days", 14)
+        d.setdefault("driver_scan_ttl_minutes", 120)
+        d.setdefault("pswindowsupdate_stamp_days", 7)
+        d.setdefault("temp_min_age_hours", 0)
+        d.setdefault("cleanup_workers", 8)
+        d.setdefault("probe_ttl_minutes", 30)
         self.settings["defaults"] = d
         return d
 
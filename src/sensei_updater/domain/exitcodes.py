@@ -0,0 +1,58 @@
+DONE = "done"
+CURRENT = "current"
+RETRY_LATER = "retry_later"
+RETRY_AFTER_CLOSE = "retry_after_close"
+REINSTALL = "reinstall"
+GIVE_UP = "give_up"
+UNKNOWN = "unknown"
+
+CODES = {
+    0x8A150008: (RETRY_LATER, "Installer download failed"),
+    0x8A150010: (GIVE_UP, "No installer applies to this system"),
+    0x8A150011: (GIVE_UP, "Installer hash does not match the manifest"),
+    0x8A150014: (GIVE_UP, "No package found matching the id"),
+    0x8A15002B: (CURRENT, "No applicable upgrade found"),
+    0x8A150056: (GIVE_UP, "Installer refuses to run elevated"),
+    0x8A150061: (CURRENT, "Package is already installed"),
+    0x8A150101: (RETRY_AFTER_CLOSE, "Application is currently running"),
+    0x8A150102: (RETRY_LATER, "Another installation is in progress"),
+    0x8A150103: (RETRY_AFTER_CLOSE, "A file to be modified is in use"),
+    0x8A150104: (GIVE_UP, "A dependency is missing"),
+    0x8A150105: (GIVE_UP, "Disk is full"),
+    0x8A150106: (RETRY_LATER, "Not enough memory to install"),
+    0x8A150107: (RETRY_LATER, "No network connection"),
+    0x8A150108: (GIVE_UP, "Installer error; contact the vendor"),
+    0x8A150109: (DONE, "Restart required to finish the installation"),
+    0x8A15010A: (RETRY_LATER, "Restart required before installing"),
+    0x8A15010B: (DONE, "Installer initiated a restart"),
+    0x8A15010C: (GIVE_UP, "Installation cancelled by the user"),
+    0x8A15010D: (CURRENT, "Another version is already installed"),
+    0x8A15010E: (CURRENT, "A higher version is already installed"),
+    0x8A15010F: (GIVE_UP, "Blocked by organization policy"),
+    0x8A150110: (GIVE_UP, "Failed to install package dependencies"),
+    0x8A150111: (RETRY_AFTER_CLOSE, "Application is in use by another application"),
+    0x8A150112: (REINSTALL, "Installer rejected its parameters"),
+    0x8A150113: (GIVE_UP, "Not supported on this system"),
+    0x8A150114: (REINSTALL, "Installer does not support upgrades"),
+    1602: (GIVE_UP, "Installation cancelled by the user"),
+    1603: (REINSTALL, "Fatal error during installation"),
+    1618: (RETRY_LATER, "Another installation is in progress"),
+    1619: (REINSTALL, "Installer package could not be opened"),
+    1625: (GIVE_UP, "Blocked by system policy"),
+    1633: (GIVE_UP, "Platform not supported"),
+    1638: (REINSTALL, "Another version of the product is installed"),
+    1641: (DONE, "Installer initiated a restart"),
+    3010: (DONE, "Restart required to finish the installation"),
+}
+REBOOT = {0x8A150109, 0x8A15010B, 1641, 3010}
+
+def normalize(rc) -> int:
+    return int(rc) & 0xFFFFFFFF
+
+def classify(rc) -> dict:
+    """What an exit code means for the fallback chain; codes not in the table are `unknown`."""
+    code = normalize(rc)
+    if code == 0:
+        return {"code": 0, "label": "0", "action": DONE, "reason": "", "reboot": False}
+    action, reason = CODES.get(code, (UNKNOWN, f"Exit code {code}"))
+    return {"code": code, "label": f"0x{code:08X}" if code > 0xFFFF else str(code), "action": action, "reason": reason, "reboot": code in REBOOT}
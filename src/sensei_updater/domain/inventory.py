@@ -0,0 +1,139 @@
+import sqlite3, threading, time
+from pathlib import Path
+from ..data.paths import CONFIG_DIR
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS packages (
+    id TEXT PRIMARY KEY COLLATE NOCASE,
+    name TEXT NOT NULL DEFAULT '',
+    version TEXT NOT NULL DEFAULT '',
+    source TEXT NOT NULL DEFAULT '',
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    present INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_packages_name ON packages(name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_packages_present ON packages(present);
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS changes (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id),
+    ts REAL NOT NULL,
+    pkg_id TEXT NOT NULL,
+    name TEXT NOT NULL DEFAULT '',
+    kind TEXT NOT NULL,
+    old_version TEXT NOT NULL DEFAULT '',
+    new_version TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_changes_ts ON changes(ts);
+CREATE INDEX IF NOT EXISTS idx_changes_pkg ON changes(pkg_id);
+"""
+
+class Inventory:
+    def __init__(self, path: Path | None=None):
+        self.path = path or (CONFIG_DIR / "inventory.db")
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _conn(self):
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.path), check_same_thread=False, timeout=10)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            if db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                db.executescript(SCHEMA)
+                db.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+                db.commit()
+            self._db = db
+        return self._db
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def last_snapshot(self):
+        with self._lock:
+            r = self._conn().execute("SELECT id, ts, count FROM snapshots ORDER BY id DESC LIMIT 1").fetchone()
+        return dict(r) if r else None
+
+    def age_s(self) -> float | None:
+        snap = self.last_snapshot()
+        return time.time() - snap["ts"] if snap else None
+
+    def apply(self, rows, ts: float | None=None) -> dict:
+        ts = ts or time.time()
+        seen = {}
+        for r in rows:
+            pid = r.get("Id") or ""
+            if pid: seen[pid.lower()] = r
+        diff = {"added": [], "removed": [], "changed": []}
+        with self._lock:
+            db = self._conn()
+            with db:
+                known = {row["id"].lower(): row for row in db.execute("SELECT id, name, version, source, present FROM packages")}
+                snap = db.execute("INSERT INTO snapshots(ts, count) VALUES (?, ?)", (ts, len(seen))).lastrowid
+                upserts, events = [], []
+                for key, r in seen.items():
+                    old = known.get(key)
+                    name, version, source = r.get("Name") or "", r.get("Version") or "", (r.get("Source") or "").lower()
+                    if old is None or not old["present"]:
+                        diff["added"].append(r)
+                        events.append((snap, ts, r["Id"], name, "added", "", version))
+                        upserts.append((r["Id"], name, version, source, ts, ts))
+                    elif (old["version"], old["name"], old["source"]) != (version, name, source):
+                        if old["version"] != version:
+                            diff["changed"].append({**r, "OldVersion": old["version"]})
+                            events.append((snap, ts, r["Id"], name, "changed", old["version"], version))
+                        upserts.append((r["Id"], name, version, source, ts, ts))
+                db.executemany(
+                    "INSERT INTO packages(id, name, version, source, first_seen, last_seen, present) VALUES (?, ?, ?, ?, ?, ?, 1) "
+                    "ON CONFLICT(id) DO UPDATE SET name=excluded.name, version=excluded.version, source=excluded.source, "
+                    "last_seen=excluded.last_seen, present=1, "
+                    "first_seen=CASE WHEN packages.present THEN packages.first_seen ELSE excluded.first_seen END",
+                    upserts)
+                db.execute("UPDATE packages SET last_seen=? WHERE present=1", (ts,))
+                gone = [old for key, old in known.items() if old["present"] and key not in seen]
+                for old in gone:
+                    diff["removed"].append({"Id": old["id"], "Name": old["name"], "Version": old["version"], "Source": old["source"]})
+                    events.append((snap, ts, old["id"], old["name"], "removed", old["version"], ""))
+                db.executemany("UPDATE packages SET present=0 WHERE id=?", [(old["id"],) for old in gone])
+                if not known:
+                    events = []
+                db.executemany("INSERT INTO changes(snapshot_id, ts, pkg_id, name, kind, old_version, new_version) VALUES (?, ?, ?, ?, ?, ?, ?)", events)
+        return diff
+
+    def _rows(self, sql: str, args=()):
+        with self._lock:
+            cur = self._conn().execute(sql, args)
+            return [{"Name": r["name"], "Id": r["id"], "Version": r["version"], "Available": "", "Source": r["source"]} for r in cur]
+
+    def rows(self):
+        return self._rows("SELECT id, name, version, source FROM packages WHERE present=1 ORDER BY name COLLATE NOCASE")
+
+    def lookup(self, ids) -> dict:
+        out = {}
+        ids = list(ids)
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            for r in self._rows(f"SELECT id, name, version, source FROM packages WHERE present=1 AND id IN ({marks})", chunk):
+                out[r["Id"].lower()] = r
+        return {pid: out[pid.lower()] for pid in ids if pid.lower() in out}
+
+    def search(self, text: str):
+        q = "%" + (text or "").replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        return self._rows("SELECT id, name, version, source FROM packages WHERE present=1 AND (id LIKE ? ESCAPE '\\' OR name LIKE ? ESCAPE '\\') "
+                          "ORDER BY name COLLATE NOCASE", (q, q))
+
+    def changes_since(self, ts: float):
+        with self._lock:
+            cur = self._conn().execute("SELECT ts, pkg_id, name, kind, old_version, new_version FROM changes WHERE ts >= ? ORDER BY ts, kind, name COLLATE NOCASE", (ts,))
+            return [dict(r) for r in cur]
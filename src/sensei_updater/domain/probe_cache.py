@@ -0,0 +1,112 @@
+import hashlib, json, os, threading, time
+from pathlib import Path
+from ..data.paths import CONFIG_DIR
+
+def boot_session_id() -> str:
+    if os.name == "nt":
+        try:
+            import ctypes
+            ticks = ctypes.windll.kernel32.GetTickCount64
+            ticks.restype = ctypes.c_uint64
+            return str(int((time.time() - ticks() / 1000.0) // 60))
+        except Exception:
+            return ""
+    try:
+        return Path("/proc/sys/kernel/random/boot_id").read_text(encoding="utf-8").strip()
+    except OSError:
+        return ""
+
+def spec_hash(spec) -> str:
+    return hashlib.sha256(json.dumps(spec, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+UNINSTALL_KEYS = (
+    ("HKEY_LOCAL_MACHINE", r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall"),
+    ("HKEY_LOCAL_MACHINE", r"SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall"),
+    ("HKEY_CURRENT_USER", r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall"),
+)
+
+def winget_state_dir() -> Path:
+    return Path(os.getenv("LOCALAPPDATA", str(Path.home()))) / "Packages" / "Microsoft.DesktopAppInstaller_8wekyb3d8bbwe" / "LocalState"
+
+def _uninstall_key_times() -> list:
+    try:
+        import winreg
+    except ImportError:
+        return []
+    parts = []
+    for hive, path in UNINSTALL_KEYS:
+        try:
+            with winreg.OpenKey(getattr(winreg, hive), path) as k:
+                count, _, latest = winreg.QueryInfoKey(k)
+                for i in range(count):
+                    try:
+                        with winreg.OpenKey(k, winreg.EnumKey(k, i)) as sub:
+                            latest = max(latest, winreg.QueryInfoKey(sub)[2])
+                    except OSError:
+                        pass
+                parts.append(f"{hive}:{count}:{latest}")
+        except OSError:
+            parts.append(f"{hive}:-")
+    return parts
+
+def _source_times(root: Path) -> list:
+    parts = []
+    try:
+        with os.scandir(root) as it:
+            for e in it:
+                if not e.name.startswith("Microsoft.Winget.Source"): continue
+                latest = e.stat().st_mtime_ns
+                if e.is_dir():
+                    with os.scandir(e.path) as inner:
+                        for f in inner:
+                            latest = max(latest, f.stat().st_mtime_ns)
+                parts.append(f"{e.name}:{latest}")
+    except OSError:
+        pass
+    return parts
+
+def install_state_stamp() -> str:
+    """Changes when the Uninstall registry keys or winget's source cache are written."""
+    return spec_hash(_uninstall_key_times() + sorted(_source_times(winget_state_dir())))
+
+class ProbeCache:
+    def __init__(self, path: Path | None=None):
+        self.path = path or (CONFIG_DIR / "probe-cache.json")
+        self.data = self._load()
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            if self.path.exists():
+                return json.loads(self.path.read_text(encoding="utf-8")) or {}
+        except Exception:
+            pass
+        return {}
+
+    def _save(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            tmp.write_text(json.dumps(self.data, indent=2), encoding="utf-8")
+            tmp.replace(self.path)
+        except Exception:
+            pass
+
+    def get(self, name: str, key: str, ttl_s: float | None):
+        e = self.data.get(name) or {}
+        if not key or e.get("key") != key:
+            return None
+        if ttl_s is not None and time.time() - float(e.get("ts") or 0) > ttl_s:
+            return None
+        return e.get("value")
+
+    def put(self, name: str, key: str, value):
+        if not key: return
+        with self._lock:
+            self.data[name] = {"key": key, "ts": time.time(), "value": value}
+            self._save()
+
+    def drop(self, name: str):
+        with self._lock:
+            if self.data.pop(name, None) is not None:
+                self._save()
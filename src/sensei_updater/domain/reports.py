@@ -1,6 +1,21 @@
-import json
+import json, time
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
+from ..core import resources
+
+SCHEMA_VERSION = 2
+
+def usage_text(u) -> str:
+    if not u or not u.get("commands"): return ""
+    parts = [f"{u['commands']} command(s)"]
+    if u.get("cpu_user_s") is not None:
+        parts.append(f"CPU {u['cpu_user_s'] + (u.get('cpu_sys_s') or 0):.1f} s")
+    if u.get("peak_rss_kb"):
+        parts.append(f"peak {u['peak_rss_kb'] / 1024:.0f} MB")
+    if u.get("read_bytes") is not None:
+        parts.append(f"read {u['read_bytes'] / 1048576:.1f} MB, wrote {(u.get('write_bytes') or 0) / 1048576:.1f} MB")
+    return " (" + ", ".join(parts) + ")"
 
 class RunReport:
     """Aggregates results and can export to JSON or TXT."""
@@ -13,15 +28,46 @@ class RunReport:
         self.skipped = []
         self.store_skipped = []
         self.failed = []
+        self.current = []
+        self.deferred = []
+        self.install_timings = []
+        self.cleanup = None
+        self.packages = []
+        self.phases = []
+        self.commands = []
+        self._seq0 = resources.mark()
         self.driver_success = None
         self.reboot_required = False
         self.notes = []
 
+    def add_results(self, res: dict):
+        for key in ("updated", "interactive", "reinstalled", "skipped", "store_skipped", "failed", "current", "deferred"):
+            getattr(self, key).extend(res.get(key) or [])
+        self.reboot_required = self.reboot_required or bool(res.get("reboot_required"))
+        if res.get("timings"):
+            self.install_timings.append(res["timings"])
+        self.packages.extend(res.get("packages") or [])
+
+    @contextmanager
+    def phase(self, name: str):
+        started, t, seq = datetime.utcnow().isoformat() + "Z", time.perf_counter(), resources.mark()
+        try:
+            yield
+        finally:
+            self.phases.append({"name": name, "started_at": started, "duration_s": round(time.perf_counter() - t, 3),
+                                "resources": resources.aggregate(resources.since(seq))})
+
+    def slowest(self, n: int=5):
+        timed = [p for p in self.packages if p.get("duration_s") is not None]
+        return sorted(timed, key=lambda p: p["duration_s"], reverse=True)[:n]
+
     def mark_finished(self):
         self.finished_at = datetime.utcnow().isoformat() + "Z"
+        self.commands = resources.since(self._seq0)
 
     def to_json(self) -> str:
         data = {
+            "schema": SCHEMA_VERSION,
             "started_at": self.started_at,
             "finished_at": self.finished_at,
             "updated": self.updated,
@@ -30,6 +76,13 @@ class RunReport:
             "skipped": self.skipped,
             "store_skipped": self.store_skipped,
             "failed": self.failed,
+            "current": self.current,
+            "deferred": self.deferred,
+            "install_timings": self.install_timings,
+            "cleanup": self.cleanup,
+            "packages": self.packages,
+            "phases": self.phases,
+            "commands": self.commands,
             "driver_success": self.driver_success,
             "reboot_required": self.reboot_required,
             "notes": self.notes,
@@ -56,6 +109,33 @@ class RunReport:
         section("Skipped", self.skipped)
         section("Store skipped (admin context)", self.store_skipped)
         section("Failed", self.failed)
+        section("Already current", self.current)
+        section("Deferred (retry next run)", self.deferred)
+        if self.install_timings:
+            lines.append("Install timings")
+            for t in self.install_timings:
+                lines.append("  - " + ", ".join(f"{k}={v}" for k, v in t.items()))
+            lines.append("")
+        if self.cleanup:
+            c = self.cleanup
+            lines.append(f"TEMP cleanup ({c['mode']}, older than {c['min_age_h']:g} h)")
+            for r in c["roots"]:
+                lines.append(f"  - {r['root']}: {r['files']} file(s), {r['bytes']} bytes, {r['dirs']} folder(s), {r['skipped']} skipped in {r['duration_s']:.1f} s")
+            lines.append(f"  Total: {c['files']} file(s), {c['bytes']} bytes in {c['duration_s']:.1f} s")
+            lines.append("")
+        if self.phases:
+            lines.append("Phases")
+            for ph in self.phases:
+                lines.append(f"  - {ph['name']}: {ph['duration_s']:.1f} s" + usage_text(ph.get("resources")))
+            lines.append("")
+        if self.packages:
+            lines.append("Packages")
+            for p in self.packages:
+                tries = ", ".join(f"{a['kind']} rc={a['rc']} {a['duration_s']:.1f} s" for a in p.get("attempts") or [])
+                dur = "-" if p.get("duration_s") is None else f"{p['duration_s']:.1f} s"
+                reason = f" [{p['code']}: {p['reason']}]" if p.get("reason") else ""
+                lines.append(f"  - {p['id']} [{p.get('source') or '?'}] {p.get('version') or '?'} -> {p.get('available') or '?'}: {p.get('outcome') or '-'}{reason} in {dur}" + (f" ({tries})" if tries else ""))
+            lines.append("")
         if self.notes:
             lines.append("Notes")
             for n in self.notes:
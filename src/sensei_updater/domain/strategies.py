@@ -0,0 +1,75 @@
+import json, threading, time
+from pathlib import Path
+from ..data.paths import CONFIG_DIR
+
+SILENT = "silent"
+STRATEGIES = (SILENT, "interactive", "reinstall")
+MAX_ENTRIES = 1000
+MAX_STREAK = 2
+
+class StrategyMemo:
+    def __init__(self, path: Path | None=None, retest_days: float=14, max_entries: int=MAX_ENTRIES):
+        self.path = path or (CONFIG_DIR / "strategies.json")
+        self.retest_s = retest_days * 86400
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.data = self._load()
+        self._dirty = False
+
+    def _load(self):
+        try:
+            if self.path.exists():
+                j = json.loads(self.path.read_text(encoding="utf-8"))
+                if isinstance(j, dict): return j
+        except Exception:
+            pass
+        return {}
+
+    def save(self):
+        with self._lock:
+            if not self._dirty: return
+            if len(self.data) > self.max_entries:
+                keep = sorted(self.data.items(), key=lambda kv: kv[1].get("seen") or 0, reverse=True)[:self.max_entries]
+                self.data = dict(keep)
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+                tmp.write_text(json.dumps(self.data, indent=2), encoding="utf-8")
+                tmp.replace(self.path)
+                self._dirty = False
+            except Exception:
+                pass
+
+    def get(self, pid: str) -> dict:
+        return dict(self.data.get(pid.lower()) or {})
+
+    def order(self, pid: str, steps=STRATEGIES) -> list:
+        e = self.data.get(pid.lower()) or {}
+        best = e.get("strategy")
+        if best not in steps or best == SILENT:
+            return list(steps)
+        if time.time() - float(e.get("ts") or 0) > self.retest_s or int(e.get("streak") or 0) >= MAX_STREAK:
+            return list(steps)
+        return [best] + [s for s in steps if s != best]
+
+    def record(self, pid: str, strategy: str | None, duration_s: float | None=None):
+        now = time.time()
+        with self._lock:
+            e = self.data.setdefault(pid.lower(), {})
+            e["seen"] = now
+            if strategy is None:
+                e["streak"] = int(e.get("streak") or 0) + 1
+            else:
+                e.update(strategy=strategy, ts=now, streak=0)
+                if duration_s is not None:
+                    avg = e.get("avg_s")
+                    e["avg_s"] = round(duration_s if avg is None else 0.7 * avg + 0.3 * duration_s, 3)
+            self._dirty = True
+
+    def evict(self, installed_ids):
+        keep = {pid.lower() for pid in installed_ids}
+        with self._lock:
+            gone = [k for k in self.data if k not in keep]
+            for k in gone:
+                del self.data[k]
+            self._dirty = self._dirty or bool(gone)
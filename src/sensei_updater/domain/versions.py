@@ -0,0 +1,55 @@
+import re
+
+UNKNOWN = "unknown"
+LATEST = "latest"
+_PART_RX = re.compile(r"(\d*)(.*)", re.S)
+_ZERO = (0, 1, "")
+
+def _parts(s: str) -> tuple:
+    parts = []
+    for raw in s.split("."):
+        m = _PART_RX.match(raw.strip())
+        digits, other = m.group(1), m.group(2).strip()
+        parts.append((int(digits) if digits else 0, 0 if other else 1, other.casefold()))
+    while parts and parts[-1] == _ZERO:
+        parts.pop()
+    parts.append(_ZERO)
+    return tuple(parts)
+
+def version_key(s: str) -> tuple:
+    """Sort key in winget's order: tagged parts below the bare number, `Unknown` lowest, `Latest` highest."""
+    t = (s or "").strip()
+    low = t.casefold()
+    if not t or low == UNKNOWN:
+        return (0,)
+    if low == LATEST:
+        return (2,)
+    approx = 0
+    if t[0] in "<>":
+        approx = -1 if t[0] == "<" else 1
+        t = t[1:].strip()
+    return (1, _parts(t), approx)
+
+def compare(a: str, b: str) -> int:
+    ka, kb = version_key(a), version_key(b)
+    return (ka > kb) - (ka < kb)
+
+def is_unknown(s: str) -> bool:
+    return version_key(s) == (0,)
+
+def partition_current(rows):
+    """(upgradable, current); rows without an Available version count as upgradable."""
+    keys = {}
+    def key(v):
+        k = keys.get(v)
+        if k is None:
+            k = keys[v] = version_key(v)
+        return k
+    upgradable, current = [], []
+    for r in rows:
+        available = r.get("Available") or ""
+        if available and key(available) <= key(r.get("Version") or ""):
+            current.append(r)
+        else:
+            upgradable.append(r)
+    return upgradable, current
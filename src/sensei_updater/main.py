@@ -2,20 +2,17 @@ import argparse, os
 from pathlib import Path
 from .core.console import Console
 from .domain.config import ConfigStore
-from .domain.reports import RunReport
-from .services.drivers import DriverService
-from .services.apps import AppService
-from .services.system import SystemService
-from .services.diagnostics import DiagnosticsService
-from .services.scheduler import SchedulerService
-from .ui.menu import Menu
 
-def main():
+EMPTY_RESULTS = ("updated", "interactive", "reinstalled", "skipped", "store_skipped", "failed", "current", "deferred")
+
+def build_parser():
     parser = argparse.ArgumentParser(description="Sensei's Updater")
     parser.add_argument("--quick", action="store_true")
     parser.add_argument("--drivers", action="store_true")
     parser.add_argument("--apps", action="store_true")
     parser.add_argument("--cleanup", action="store_true")
+    parser.add_argument("--cleanup-estimate", action="store_true")
+    parser.add_argument("--min-age", type=float, default=None, metavar="HOURS")
     parser.add_argument("--health", action="store_true")
     parser.add_argument("--startup", action="store_true")
     parser.add_argument("--profile", type=str, default=None)
@@ -29,12 +26,313 @@ def main():
     parser.add_argument("--task-name", type=str, default="SenseisUpdater Auto Update")
     parser.add_argument("--unschedule", action="store_true")
     parser.add_argument("--tui", action="store_true")
+    parser.add_argument("--pipeline", action="store_true")
+    parser.add_argument("--jobs", type=int, default=None)
+    parser.add_argument("--batch", action="store_true")
+    parser.add_argument("--refresh-pswindowsupdate", action="store_true")
     parser.add_argument("--dry-run", action="store_true")
     parser.add_argument("--debug", action="store_true")
+    parser.add_argument("--trace", type=str, default=None, metavar="OUT.json")
+    parser.add_argument("--inventory-diff", type=float, nargs="?", const=7, default=None, metavar="DAYS")
     parser.add_argument("--export", type=str)
     parser.add_argument("--import", dest="import_path", type=str)
+    return parser
+
+def _probe_pending_reboot(system, cache, ttl_s):
+    from .domain.probe_cache import boot_session_id
+    key = boot_session_id()
+    hit = cache.get("pending_reboot", key, None) if key else None
+    if hit is True:
+        return True
+    hit = cache.get("pending_reboot", key, ttl_s) if key else None
+    if hit is not None:
+        return bool(hit)
+    pending = system.has_pending_reboot()
+    cache.put("pending_reboot", key, bool(pending))
+    return pending
+
+def _probe_task_exists(sched, cache, spec, ttl_s):
+    from .domain.probe_cache import spec_hash
+    key = spec_hash(spec)
+    hit = cache.get("schedule_task", key, ttl_s)
+    if hit is not None:
+        return bool(hit)
+    exists = sched.exists(spec["task_name"])
+    cache.put("schedule_task", key, bool(exists))
+    return exists
+
+def _await(fut, default=None):
+    if fut is None:
+        return default
+    try:
+        return fut.result()
+    except Exception:
+        return default
+
+class StartupProbes:
+    """Starts the startup probes a mode needs in parallel; each result is awaited where it is used."""
+    def __init__(self, console, cfg, app=None, system=None, schedule: bool=True):
+        from concurrent.futures import ThreadPoolExecutor
+        from .domain.probe_cache import ProbeCache
+        self.console = console
+        self.cfg = cfg
+        self.app = app
+        self.cache = ProbeCache()
+        self.sched = None
+        self.spec = cfg.get_schedule()
+        ttl_s = float(cfg.get_defaults().get("probe_ttl_minutes", 30)) * 60
+        pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix="probe")
+        self.env_f = pool.submit(app.capabilities) if app is not None else None
+        self.reboot_f = None
+        if system is not None and not console.dry_run:
+            self.reboot_f = pool.submit(_probe_pending_reboot, system, self.cache, ttl_s)
+        self.sched_f = None
+        s = self.spec
+        if schedule and s.get("enabled") and s.get("frequency") and s.get("task_name"):
+            from .services.scheduler import SchedulerService
+            self.sched = SchedulerService(console=console)
+            self.sched_f = pool.submit(_probe_task_exists, self.sched, self.cache, s, ttl_s)
+        pool.shutdown(wait=False)
+
+    def warn_environment(self):
+        if self.env_f is not None:
+            _await(self.env_f)
+            self.app.check_environment()
+
+    def warn_pending_reboot(self):
+        if _await(self.reboot_f, False):
+            self.console.warn("Windows indicates a pending reboot. Consider rebooting before updates to avoid conflicts.")
+
+    def apply_saved_schedule(self):
+        from .domain.probe_cache import spec_hash
+        s = self.spec
+        if self.sched_f is not None and not _await(self.sched_f, True):
+            ok = self.sched.create(s["frequency"], s["time"], s["task_name"], s["args"])
+            if ok:
+                self.cache.put("schedule_task", spec_hash(s), True)
+                self.console.ok("Applied saved schedule.")
+            else: self.console.warn("Failed to apply saved schedule.")
+
+    def settle(self):
+        self.warn_environment()
+        self.warn_pending_reboot()
+        self.apply_saved_schedule()
+
+def settle_probes(console, cfg, app=None, schedule: bool=True):
+    from .services.system import SystemService
+    if app is None:
+        from .services.apps import AppService
+        app = AppService(console=console, cfg=cfg)
+    StartupProbes(console, cfg, app=app, system=SystemService(console=console), schedule=schedule).settle()
+
+def cmd_unschedule(args, console, cfg):
+    from .services.scheduler import SchedulerService
+    from .domain.probe_cache import ProbeCache
+    settle_probes(console, cfg, schedule=False)
+    ProbeCache().drop("schedule_task")
+    if SchedulerService(console=console).delete(args.task_name):
+        console.ok(f"Removed scheduled task: {args.task_name}")
+    else:
+        console.warn(f"Could not remove scheduled task: {args.task_name}")
+
+def cmd_schedule(args, console, cfg):
+    from .services.scheduler import SchedulerService
+    from .domain.probe_cache import ProbeCache, spec_hash
+    settle_probes(console, cfg, schedule=False)
+    out_dir = Path(os.getenv("LOCALAPPDATA", str(Path.home()))).joinpath("SenseiUpdater")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    extra = []
+    if args.quick: extra += ["--quick"]
+    if args.drivers: extra += ["--drivers"]
+    if args.apps: extra += ["--apps"]
+    if args.cleanup: extra += ["--cleanup"]
+    if args.min_age is not None: extra += ["--min-age", f"{args.min_age:g}"]
+    if args.health: extra += ["--health"]
+    if args.startup: extra += ["--startup"]
+    if args.profile: extra += ["--profile", args.profile]
+    if args.yes: extra += ["--yes"]
+    if args.pipeline: extra += ["--pipeline"]
+    if args.jobs: extra += ["--jobs", str(args.jobs)]
+    if args.batch: extra += ["--batch"]
+    if args.trace: extra += ["--trace", str(Path(args.trace).expanduser().resolve())]
+    extra += ["--report", args.report or "json", "--out", args.out or str(out_dir.joinpath("last-run.json"))]
+    ok = SchedulerService(console=console).create(args.schedule, args.time, args.task_name, extra)
+    if ok:
+        cfg.set_schedule(True, args.schedule, args.time, args.task_name, extra)
+        ProbeCache().put("schedule_task", spec_hash(cfg.get_schedule()), True)
+        console.ok(f"Scheduled {args.schedule} at {args.time}: {args.task_name}")
+    else:
+        console.err("Scheduling failed.")
+
+def cmd_export(args, console, cfg):
+    settle_probes(console, cfg)
+    out_path = cfg.export_profiles(args.export)
+    console.ok(f"Exported profiles to {out_path}")
+
+def cmd_import(args, console, cfg):
+    settle_probes(console, cfg)
+    ok, err = cfg.import_profiles(args.import_path, merge=True)
+    if ok:
+        console.ok("Imported profiles.")
+    else:
+        console.err(f"Import failed: {err}")
+
+def cmd_inventory_diff(args, console, cfg):
+    import time
+    from .services.apps import AppService
+    from .core.colors import GREEN, RED, YELLOW, GRAY, RESET
+    app = AppService(console=console, cfg=cfg)
+    settle_probes(console, cfg, app=app)
+    if not console.dry_run:
+        app.list_installed(refresh=True)
+    inv = app.inventory()
+    snap = inv.last_snapshot()
+    if not snap:
+        console.warn("No inventory yet. Run without --dry-run to take the first snapshot.")
+        return
+    days = max(0.0, args.inventory_diff)
+    changes = inv.changes_since(time.time() - days * 86400)
+    console.header(f"Installed apps: changes in the last {days:g} day(s)")
+    marks = {"added": (GREEN, "+"), "removed": (RED, "-"), "changed": (YELLOW, "~")}
+    for c in changes:
+        color, mark = marks.get(c["kind"], (GRAY, "?"))
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(c["ts"]))
+        if c["kind"] == "changed": ver = f"{c['old_version']} → {c['new_version']}"
+        else: ver = c["new_version"] or c["old_version"]
+        print(f"{color}{mark} {c['pkg_id']}{RESET}  {c['name']}  {ver}  {GRAY}{when}{RESET}")
+    counts = {k: sum(1 for c in changes if c["kind"] == k) for k in marks}
+    console.info(f"{counts['added']} added, {counts['removed']} removed, {counts['changed']} changed; {snap['count']} installed now.")
+
+def cmd_tui(args, console, cfg) -> bool:
+    from .services.apps import AppService
+    from .services.system import SystemService
+    app = AppService(console=console, cfg=cfg)
+    StartupProbes(console, cfg, app=app, system=SystemService(console=console)).settle()
+    try:
+        from .ui.tui import run_tui
+        run_tui(console, app, cfg)
+        return True
+    except Exception:
+        console.err("TUI not available. Install with: pip install '.[tui]'")
+        return False
+
+def cmd_actions(args, console, cfg, settled: bool=False):
+    from .domain.reports import RunReport
+    from .ui.summary import print_summary
+    wants_apps = bool(args.quick or args.apps or args.profile)
+    wants_drivers = bool(args.quick or args.drivers)
+    wants_system = bool(args.quick or args.cleanup or args.cleanup_estimate or args.health or args.startup or args.diagnostics)
+    app = system = drivers = None
+    if wants_apps or args.diagnostics:
+        from .services.apps import AppService
+        app = AppService(console=console, cfg=cfg)
+    if wants_system or wants_apps or wants_drivers:
+        from .services.system import SystemService
+        system = SystemService(console=console, cfg=cfg)
+    if wants_drivers:
+        from .services.drivers import DriverService
+        drivers = DriverService(console=console, cfg=cfg, refresh_module=args.refresh_pswindowsupdate)
+    if not settled:
+        StartupProbes(console, cfg, app=app, system=system if (wants_apps or wants_drivers) else None).settle()
+    pipeline = True if args.pipeline else None
+    batch = True if args.batch else None
+
+    report = RunReport()
+    selected_ids = []
+    if args.profile:
+        selected_ids = list(cfg.get_profile(args.profile))
+        if not selected_ids:
+            console.warn(f"Profile '{args.profile}' is empty or missing.")
+
+    if wants_drivers:
+        with report.phase("drivers"):
+            ok, reboot = drivers.update_drivers()
+        report.driver_success = ok
+        report.reboot_required = report.reboot_required or reboot
+
+    if wants_apps:
+        if selected_ids:
+            with report.phase("apps"):
+                res = app.update_ids(selected_ids, pipeline=pipeline, jobs=args.jobs, batch=batch)
+        else:
+            selector = None
+            with report.phase("scan"):
+                if args.yes:
+                    upgrades = app.list_upgrades(stale_ok=True)
+                else:
+                    from .ui.selector import Selector
+                    selector = Selector(console, cfg)
+                    upgrades = selector.scan(lambda on_row: app.list_upgrades(on_row=on_row, stale_ok=True), title="Upgradable Apps (winget)")
+                if upgrades and args.yes:
+                    fresh = app.await_refresh()
+                    if fresh is not None:
+                        upgrades = fresh
+            if upgrades and args.yes:
+                with report.phase("apps"):
+                    res = app.update_ids([p["Id"] for p in upgrades], pipeline=pipeline, jobs=args.jobs, batch=batch, rows=upgrades)
+            elif upgrades and not args.yes:
+                console.info("Opening interactive selector (no --yes provided).")
+                chosen = selector.loop(upgrades, app, title="Upgradable Apps (winget)", shown=True)
+                chosen = app.revalidate_ids(chosen or [], upgrades)
+                if chosen:
+                    with report.phase("apps"):
+                        res = app.update_ids(chosen, pipeline=pipeline, jobs=args.jobs, batch=batch, rows=upgrades)
+                else:
+                    res = {k: [] for k in EMPTY_RESULTS}
+            else:
+                console.warn("No upgrades detected by winget.")
+                res = {k: [] for k in EMPTY_RESULTS}
+        report.add_results(res)
+
+    if args.quick or args.cleanup:
+        with report.phase("cleanup"):
+            report.cleanup = system.cleanup_temp(min_age_h=args.min_age)
+            system.empty_recycle_bin()
+    elif args.cleanup_estimate:
+        with report.phase("cleanup"):
+            report.cleanup = system.cleanup_temp(estimate=True, min_age_h=args.min_age)
+
+    if args.quick or args.health:
+        with report.phase("health"):
+            system.dism_sfc()
+
+    if args.startup:
+        system.show_startup()
+
+    report.mark_finished()
+    print_summary(console, report)
+    if args.report and args.out:
+        out_path = Path(args.out).expanduser()
+        try:
+            report.save(args.report, out_path)
+            console.ok(f"Report written: {out_path}")
+        except Exception as e:
+            console.warn(f"Could not write report: {e}")
+    if args.diagnostics:
+        from .services.diagnostics import DiagnosticsService
+        zip_path = Path(args.diag_out).expanduser() if args.diag_out else Path.cwd() / "sensei-diagnostics.zip"
+        try:
+            diag = DiagnosticsService(console=console, cfg=cfg, app=app, system=system)
+            diag.create(zip_path=zip_path, report=report, report_fmt=args.report or "json")
+            console.ok(f"Diagnostics zip written: {zip_path}")
+        except Exception as e:
+            console.warn(f"Could not create diagnostics: {e}")
 
-    args = parser.parse_args()
+def cmd_menu(args, console, cfg, settled: bool=False):
+    from .services.apps import AppService
+    from .services.drivers import DriverService
+    from .services.system import SystemService
+    from .services.scheduler import SchedulerService
+    from .ui.menu import Menu
+    app = AppService(console=console, cfg=cfg)
+    system = SystemService(console=console, cfg=cfg)
+    if not settled:
+        StartupProbes(console, cfg, app=app, system=system).settle()
+    menu = Menu(console=console, app=app, drivers=DriverService(console=console, cfg=cfg, refresh_module=args.refresh_pswindowsupdate), system=system, cfg=cfg, scheduler=SchedulerService(console=console))
+    menu.run()
+
+def main():
+    args = build_parser().parse_args()
 
     console = Console(debug=args.debug, dry_run=args.dry_run)
     console.enable_windows_ansi_utf8()
@@ -52,146 +350,39 @@ def main():
         args.out = defaults.get("out")
     prefer_tui = bool(defaults.get("prefer_tui"))
 
-    app = AppService(console=console, cfg=cfg)
-    drivers = DriverService(console=console)
-    system = SystemService(console=console)
-    diag = DiagnosticsService(console=console, cfg=cfg, app=app, system=system)
-    sched = SchedulerService(console=console)
-
-    app.check_environment()
+    if not args.trace:
+        return dispatch(args, console, cfg, prefer_tui)
+    from .core import trace
+    trace.start()
     try:
-        if system.has_pending_reboot():
-            console.warn("Windows indicates a pending reboot. Consider rebooting before updates to avoid conflicts.")
-    except Exception:
-        pass
-
-    s = cfg.get_schedule()
-    if s.get("enabled") and s.get("frequency") and s.get("task_name"):
-        if not sched.exists(s["task_name"]):
-            ok = sched.create(s["frequency"], s["time"], s["task_name"], s["args"])
-            if ok: console.ok("Applied saved schedule.")
-            else: console.warn("Failed to apply saved schedule.")
+        return dispatch(args, console, cfg, prefer_tui)
+    finally:
+        out_path = Path(args.trace).expanduser()
+        try:
+            trace.stop(out_path)
+            console.ok(f"Trace written: {out_path}")
+        except Exception as e:
+            console.warn(f"Could not write trace: {e}")
 
+def dispatch(args, console, cfg, prefer_tui: bool):
     if args.unschedule and args.task_name:
-        if sched.delete(args.task_name):
-            console.ok(f"Removed scheduled task: {args.task_name}")
-        else:
-            console.warn(f"Could not remove scheduled task: {args.task_name}")
-        return
-
+        return cmd_unschedule(args, console, cfg)
     if args.schedule:
-        out_dir = Path(os.getenv("LOCALAPPDATA", str(Path.home()))).joinpath("SenseiUpdater")
-        out_dir.mkdir(parents=True, exist_ok=True)
-        extra = []
-        if args.quick: extra += ["--quick"]
-        if args.drivers: extra += ["--drivers"]
-        if args.apps: extra += ["--apps"]
-        if args.cleanup: extra += ["--cleanup"]
-        if args.health: extra += ["--health"]
-        if args.startup: extra += ["--startup"]
-        if args.profile: extra += ["--profile", args.profile]
-        if args.yes: extra += ["--yes"]
-        extra += ["--report", args.report or "json", "--out", args.out or str(out_dir.joinpath("last-run.json"))]
-        ok = sched.create(args.schedule, args.time, args.task_name, extra)
-        if ok:
-            cfg.set_schedule(True, args.schedule, args.time, args.task_name, extra)
-            console.ok(f"Scheduled {args.schedule} at {args.time}: {args.task_name}")
-        else:
-            console.err("Scheduling failed.")
-        return
-
+        return cmd_schedule(args, console, cfg)
+    if args.inventory_diff is not None:
+        return cmd_inventory_diff(args, console, cfg)
     if args.export:
-        out_path = cfg.export_profiles(args.export)
-        console.ok(f"Exported profiles to {out_path}")
-        return
-
+        return cmd_export(args, console, cfg)
     if args.import_path:
-        ok, err = cfg.import_profiles(args.import_path, merge=True)
-        if ok:
-            console.ok("Imported profiles.")
-        else:
-            console.err(f"Import failed: {err}")
-        return
-
+        return cmd_import(args, console, cfg)
+    settled = False
     if args.tui or prefer_tui:
-        try:
-            from .ui.tui import run_tui
-            run_tui(console, app, cfg)
+        if cmd_tui(args, console, cfg):
             return
-        except Exception:
-            console.err("TUI not available. Install with: pip install '.[tui]'")
-
-    if args.quick or args.drivers or args.apps or args.cleanup or args.health or args.startup or args.profile or args.diagnostics:
-        report = RunReport()
-        selected_ids = []
-        if args.profile:
-            selected_ids = list(cfg.get_profile(args.profile))
-            if not selected_ids:
-                console.warn(f"Profile '{args.profile}' is empty or missing.")
-
-        if args.quick or args.drivers:
-            ok, reboot = drivers.update_drivers()
-            report.driver_success = ok
-            report.reboot_required = report.reboot_required or reboot
-
-        if args.quick or args.apps or args.profile:
-            if selected_ids:
-                res = app.update_ids(selected_ids)
-            else:
-                upgrades = app.list_upgrades()
-                if upgrades and args.yes:
-                    res = app.update_ids([p["Id"] for p in upgrades])
-                elif upgrades and not args.yes:
-                    from .ui.selector import Selector
-                    console.info("Opening interactive selector (no --yes provided).")
-                    chosen = Selector(console, cfg).loop(upgrades, app, title="Upgradable Apps (winget)")
-                    if chosen:
-                        res = app.update_ids(chosen)
-                    else:
-                        res = {"updated":[], "interactive":[], "reinstalled":[], "skipped":[], "store_skipped":[], "failed":[]}
-                else:
-                    console.warn("No upgrades detected by winget.")
-                    res = {"updated":[], "interactive":[], "reinstalled":[], "skipped":[], "store_skipped":[], "failed":[]}
-            report.updated.extend(res["updated"])
-            report.interactive.extend(res["interactive"])
-            report.reinstalled.extend(res["reinstalled"])
-            report.skipped.extend(res["skipped"])
-            report.store_skipped.extend(res["store_skipped"])
-            report.failed.extend(res["failed"])
-
-        if args.quick or args.cleanup:
-            system.cleanup_temp()
-            system.empty_recycle_bin()
-
-        if args.quick or args.health:
-            system.dism_sfc()
-
-        if args.startup:
-            system.show_startup()
-
-        report.mark_finished()
-        from .ui.menu import Menu as _Menu
-        _Menu(console, app, drivers, system, cfg)._print_summary(report)
-        if args.report and args.out:
-            out_path = Path(args.out).expanduser()
-            try:
-                report.save(args.report, out_path)
-                console.ok(f"Report written: {out_path}")
-            except Exception as e:
-                console.warn(f"Could not write report: {e}")
-        if args.diagnostics:
-            zip_path = Path(args.diag_out).expanduser() if args.diag_out else Path.cwd() / "sensei-diagnostics.zip"
-            try:
-                diag = DiagnosticsService(console=console, cfg=cfg, app=app, system=system)
-                diag.create(zip_path=zip_path, report=report, report_fmt=args.report or "json")
-                console.ok(f"Diagnostics zip written: {zip_path}")
-            except Exception as e:
-                console.warn(f"Could not create diagnostics: {e}")
-        return
-
-    from .ui.menu import Menu as _Menu
-    menu = _Menu(console=console, app=app, drivers=drivers, system=system, cfg=cfg, scheduler=sched)
+        settled = True
+    if args.quick or args.drivers or args.apps or args.cleanup or args.cleanup_estimate or args.health or args.startup or args.profile or args.diagnostics:
+        return cmd_actions(args, console, cfg, settled=settled)
     try:
-        menu.run()
+        cmd_menu(args, console, cfg, settled=settled)
     finally:
-        console.close()
\ No newline at end of file
+        console.close()
@@ -1,16 +1,34 @@
-import re, json, time
+import json, time, threading
+from datetime import datetime
 from pathlib import Path
+from ..core import resources, trace
 from ..core.process import Process
 from ..core.colors import *
 from ..core.console import Console
 from ..core.spinner import Spinner
 from ..data.paths import CONFIG_DIR
+from ..domain.probe_cache import install_state_stamp
+from ..domain.versions import partition_current, is_unknown
+from ..domain import exitcodes
+from .wingettable import looks_like_version, looks_like_id, parse_table, TableStream, GAP_RX
 
-def looks_like_version(s:str) -> bool:
-    return bool(re.fullmatch(r"[0-9]+(\.[0-9A-Za-z\-+]+)+", s or ""))
+def drain(rows_gen, on_row=None):
+    """Feeds each row to `on_row` and returns the generator's final list, or None if its scan failed."""
+    while True:
+        try:
+            row = next(rows_gen)
+        except StopIteration as stop:
+            return stop.value
+        if on_row: on_row(row)
+
+def _stamp(ts: float) -> str:
+    return datetime.utcfromtimestamp(ts).isoformat() + "Z"
 
-def looks_like_id(s:str) -> bool:
-    return bool(re.fullmatch(r"[A-Za-z0-9][A-Za-z0-9\-\._]+[A-Za-z0-9]", s or "")) and (" " not in s) and ("." in s)
+def format_age(seconds: float) -> str:
+    m = int(seconds // 60)
+    if m < 1: return "less than a minute"
+    if m < 60: return f"{m} min"
+    return f"{m // 60} h {m % 60} min"
 
 class AppService:
     def __init__(self, console: Console, cfg):
@@ -18,178 +36,760 @@ class AppService:
         self.proc = Process(debug=console.debug, dry_run=console.dry_run)
         self.cfg = cfg
         self.cache_path = CONFIG_DIR / "last-upgrades.json"
-        self.cache_ttl_min = int((self.cfg.get_defaults() or {}).get("cache_ttl_minutes", 15))
+        d = self.cfg.get_defaults() or {}
+        self.cache_ttl_min = int(d.get("cache_ttl_minutes", 15))
+        self.cache_max_age_min = max(self.cache_ttl_min, int(d.get("cache_max_age_minutes", 240)))
+        self.served_age_s = None
+        self._cache_lock = threading.Lock()
+        self._refresh = None
+        self._inventory = None
+        self._inv_refresh = None
+        self.inventory_ttl_min = int(d.get("inventory_ttl_minutes", 60))
+        self.in_use_retry_s = int(d.get("in_use_retry_seconds", 20))
+        self._fresh = None
+        self.caps_path = CONFIG_DIR / "winget-caps.json"
+        self._caps = None
+        self._probe_rows = None
+        self._live_rows = None
+        self._installer_types = {}
+        self._unknown_version = set()
+        self._memo = None
 
-    def _cache_write(self, rows):
+    def _cache_key(self) -> str:
+        caps = self.capabilities()
+        ctx = "admin" if self.console.is_admin() else "user"
+        return f"{ctx}|{','.join(sorted(caps.get('sources') or []))}|{caps.get('version') or ''}"
+
+    def _cache_load(self):
         try:
-            self.cache_path.write_text(json.dumps({"ts": time.time(), "rows": rows}, indent=2), encoding="utf-8")
+            if self.cache_path.exists():
+                j = json.loads(self.cache_path.read_text(encoding="utf-8"))
+                if isinstance(j, dict) and isinstance(j.get("entries"), dict):
+                    return j
         except Exception:
             pass
+        return {"entries": {}}
+
+    def _cache_save(self, j):
+        try:
+            tmp = self.cache_path.with_suffix(self.cache_path.suffix + ".tmp")
+            tmp.write_text(json.dumps(j, indent=2), encoding="utf-8")
+            tmp.replace(self.cache_path)
+        except Exception:
+            pass
+
+    def _cache_write(self, rows):
+        key, stamp = self._cache_key(), install_state_stamp()
+        with self._cache_lock:
+            j = self._cache_load()
+            j["entries"] = {k: e for k, e in j["entries"].items() if e.get("stamp") == stamp}
+            j["entries"][key] = {"ts": time.time(), "stamp": stamp, "rows": rows}
+            self._cache_save(j)
 
     def _cache_read(self):
+        key = self._cache_key()
+        with self._cache_lock:
+            e = self._cache_load()["entries"].get(key) or {}
         try:
-            if self.cache_path.exists():
-                j = json.loads(self.cache_path.read_text(encoding="utf-8"))
-                ts = float(j.get("ts") or 0)
-                if ts and (time.time() - ts) <= self.cache_ttl_min * 60:
-                    return j.get("rows") or []
+            ts = float(e.get("ts") or 0)
+        except (TypeError, ValueError):
+            return [], None
+        age = time.time() - ts
+        if not ts or age > self.cache_max_age_min * 60:
+            return [], None
+        if e.get("stamp") != install_state_stamp():
+            return [], None
+        return e.get("rows") or [], age
+
+    def _cache_forget(self, ids, stamp_before: str):
+        """Drops upgraded packages from every entry; entries that were current adopt the new install-state stamp."""
+        done = set(ids)
+        stamp = install_state_stamp()
+        with self._cache_lock:
+            j = self._cache_load()
+            entries = {}
+            for k, e in j["entries"].items():
+                if e.get("stamp") != stamp_before: continue
+                e["rows"] = [r for r in e.get("rows") or [] if r.get("Id") not in done]
+                e["stamp"] = stamp
+                entries[k] = e
+            j["entries"] = entries
+            self._cache_save(j)
+
+    def _caps_write(self, caps):
+        try:
+            self.caps_path.write_text(json.dumps(caps, indent=2), encoding="utf-8")
         except Exception:
             pass
-        return []
 
-    def check_environment(self):
+    def _caps_read(self):
+        try:
+            if self.caps_path.exists():
+                return json.loads(self.caps_path.read_text(encoding="utf-8")) or {}
+        except Exception:
+            pass
+        return {}
+
+    def _parse_sources(self, text: str):
+        names = []
+        seen_sep = False
+        for ln in (text or "").splitlines():
+            t = ln.strip()
+            if not t: continue
+            if set(t) <= set("-"):
+                seen_sep = True
+                continue
+            if seen_sep:
+                names.append(t.split()[0])
+        return names
+
+    def _table_dialect(self, text: str):
+        lines = [ln.rstrip() for ln in (text or "").splitlines()]
+        for i, ln in enumerate(lines):
+            t = ln.strip()
+            if not t or not set(t) <= set("-") or i == 0: continue
+            header = lines[i-1].strip()
+            for row in lines[i+1:]:
+                cols = GAP_RX.split(row.strip())
+                if len(cols) < 3: continue
+                kinds = ["name"]
+                for c in cols[1:]:
+                    if looks_like_version(c): kinds.append("version")
+                    elif looks_like_id(c): kinds.append("id")
+                    elif c.lower() in ("winget","msstore"): kinds.append("source")
+                    else: kinds.append("?")
+                return {"header": header, "columns": ",".join(kinds)}
+            return {"header": header, "columns": ""}
+        return None
+
+    def _rows_from_json(self, out: str):
+        try:
+            data = json.loads(out)
+        except json.JSONDecodeError:
+            return None
+        def mapit(p):
+            return {
+                "Id": p.get("PackageIdentifier") or p.get("Id") or "",
+                "Name": p.get("PackageName") or p.get("Name") or "",
+                "Version": p.get("InstalledVersion") or p.get("Version") or "",
+                "Available": p.get("AvailableVersion") or p.get("Available") or "",
+                "Source": p.get("Source") or "",
+            }
+        arr = data.get("InstalledPackages", []) if isinstance(data, dict) else data
+        return [x for x in map(mapit, arr or []) if x["Id"]]
+
+    def _probe_capabilities(self, version: str):
+        caps = {"version": version, "available": True, "probed_at": time.time(), "sources_ok": False, "sources": [], "json": False, "dialect": None}
+        rc, out = self.proc.run_capture(["winget","source","list"])
+        if rc == 0:
+            caps["sources_ok"] = True
+            caps["sources"] = self._parse_sources(out)
+        rc, out, timeout = self.proc.run_capture_timeout(["winget","upgrade","--output","json"], 60)
+        s = (out or "").strip()
+        if rc == 0 and not timeout and s.startswith(("{","[")):
+            rows = self._rows_from_json(s)
+            if rows is not None:
+                caps["json"] = True
+                self._probe_rows = rows or None
+        return caps
+
+    def capabilities(self, force: bool=False):
+        if self._caps is not None and not force:
+            return self._caps
         rc, out = self.proc.run_capture(["winget","--version"])
+        version = (out or "").strip()
         if rc != 0:
+            self._caps = {"version": "", "available": False, "sources_ok": False, "sources": [], "json": False, "dialect": None}
+            return self._caps
+        if not version:
+            self._caps = {"version": "", "available": True, "sources_ok": True, "sources": [], "json": False, "dialect": None}
+            return self._caps
+        caps = self._caps_read()
+        retry_s = float(self.cfg.get_defaults().get("probe_ttl_minutes", 30)) * 60
+        degraded = not (caps.get("json") and caps.get("sources_ok"))
+        if force or caps.get("version") != version or (degraded and time.time() - float(caps.get("probed_at") or 0) > retry_s):
+            caps = self._probe_capabilities(version)
+            self._caps_write(caps)
+        self._caps = caps
+        return caps
+
+    def _remember_dialect(self, text: str):
+        caps = self._caps
+        if not caps or not caps.get("version"): return
+        d = self._table_dialect(text)
+        if d and d != caps.get("dialect"):
+            caps["dialect"] = d
+            self._caps_write(caps)
+
+    def check_environment(self):
+        caps = self.capabilities()
+        if not caps.get("available"):
             self.console.warn("winget was not found or failed to run. Install/update 'App Installer' from Microsoft Store, then reopen the terminal.")
             return
-        rc2, out2 = self.proc.run_capture(["winget","source","list"])
-        if rc2 != 0:
+        if not caps.get("sources_ok"):
             self.console.warn("winget sources unavailable. Try: winget source reset --force")
-        rc3, out3 = self.proc.run_capture(["winget","upgrade","--output","json"])
-        if rc3 != 0 or not (out3 or "").lstrip().startswith(("{","[")):
+        if not caps.get("json"):
             self.console.warn("winget JSON output not available. Falling back to table parsing.")
 
     def _parse_table(self, text: str):
-        lines = [ln.rstrip() for ln in (text or "").splitlines()]
-        rows = []
-        for s in lines:
-            t = s.strip()
-            if not t: continue
-            l = t.lower()
-            if l.startswith("found ") or l.startswith("the following") or l.startswith("no "): continue
-            cols = re.split(r"\s{2,}", t)
-            if len(cols) < 2: continue
-            name = cols[0]
-            if len(cols) >= 2 and looks_like_id(cols[1]) and not looks_like_version(cols[1]):
-                pid = cols[1]
-                version  = cols[2] if len(cols) >= 3 else ""
-                available= cols[3] if len(cols) >= 4 else ""
-                source   = cols[4] if len(cols) >= 5 else ""
-            elif len(cols) >= 3 and looks_like_version(cols[1]) and looks_like_id(cols[2]):
-                pid = cols[2]
-                version  = cols[1]
-                available= cols[3] if len(cols) >= 4 else ""
-                source   = cols[4] if len(cols) >= 5 else ""
-            else:
-                pid = version = available = source = ""
-                for c in cols[1:]:
-                    if not pid and looks_like_id(c) and not looks_like_version(c): pid = c
-                    elif not version and looks_like_version(c): version = c
-                    elif not available and looks_like_version(c): available = c
-                    elif not source and c.lower() in ("winget","msstore","store","msi","exe","msix"): source = c
-            if not pid: continue
-            rows.append({"Name":name,"Id":pid,"Version":version,"Available":available,"Source":source})
-        dedup = {}
-        for r in rows: dedup[r["Id"]] = r
-        return list(dedup.values())
+        return parse_table(text)
 
     def _json_supported(self) -> bool:
-        rc,_ = self.proc.run_capture(["winget","--version"])
-        if rc != 0: return False
-        rc,out = self.proc.run_capture(["winget","upgrade","--output","json"])
-        s=(out or "").strip()
-        return rc==0 and (s.startswith("{") or s.startswith("["))
-
-    def list_upgrades(self):
-        cached = self._cache_read()
-        if cached:
+        return bool(self.capabilities().get("json"))
+
+    def _scan_table(self, cmds, timeout_s: float, keep=None):
+        clean = None
+        for cmd in cmds:
+            table = TableStream()
+            chunks = self.proc.iter_capture(cmd, timeout_s)
+            while True:
+                try:
+                    chunk = next(chunks)
+                except StopIteration as stop:
+                    res = stop.value
+                    break
+                for r in table.feed(chunk):
+                    if keep is None or keep(r): yield r
+            for r in table.close():
+                if keep is None or keep(r): yield r
+            rows = [r for r in table.rows() if keep is None or keep(r)]
+            if res.rc == 0 and not res.timed_out:
+                if rows:
+                    return rows, res.out, cmd
+                clean = clean or (res.out, cmd)
+        if clean:
+            return [], clean[0], clean[1]
+        return None, "", None
+
+    def _scan_upgrades(self):
+        if self._json_supported():
+            rows = self._probe_rows
+            self._probe_rows = None
+            if rows is None:
+                rc,out,timeout = self.proc.run_capture_timeout(["winget","upgrade","--output","json"], 60)
+                if rc==0 and not timeout and out:
+                    rows = self._rows_from_json(out)
+            if rows:
+                self._cache_write(rows)
+                self._live_rows = rows
+                yield from rows
+                return rows
+        rows, out, _ = yield from self._scan_table((["winget","upgrade"], ["winget","upgrade","--include-unknown"]), 45)
+        if rows:
+            self._remember_dialect(out)
+            self._cache_write(rows)
+        if rows is not None:
+            self._live_rows = rows
+        return rows
+
+    def iter_upgrades(self, stale_ok: bool=False):
+        """Yields rows as winget prints them; with `stale_ok`, a stale cache is served while a background refresh runs."""
+        self.served_age_s = None
+        cached, age = self._cache_read()
+        if cached and age <= self.cache_ttl_min * 60:
+            yield from cached
             return cached
+        if cached and stale_ok:
+            self.served_age_s = age
+            self.start_refresh()
+            self.console.info(f"Showing the scan from {format_age(age)} ago; refreshing in the background.")
+            yield from cached
+            return cached
+        rows = yield from self._scan_upgrades()
+        return rows if rows is not None else []
+
+    def start_refresh(self):
+        if self._refresh is not None and self._refresh.is_alive(): return
+        self._fresh = None
+        def run():
+            try:
+                self._fresh = drain(self._scan_upgrades())
+            except Exception:
+                self._fresh = None
+        self._refresh = threading.Thread(target=run, name="upgrade-refresh", daemon=True)
+        self._refresh.start()
+
+    @property
+    def refreshing(self) -> bool:
+        return self._refresh is not None
+
+    def await_refresh(self, timeout: float | None=None):
+        t = self._refresh
+        if t is None:
+            return None
+        t.join(timeout)
+        if t.is_alive():
+            return None
+        self._refresh = None
+        self.served_age_s = None
+        return self._fresh
+
+    def revalidate_ids(self, ids: list[str], shown):
+        if not ids or not self.refreshing:
+            return ids
+        self.console.info("Waiting for the background scan to finish…")
+        fresh = self.await_refresh()
+        if fresh is None:
+            return ids
+        shown_ids = {r.get("Id") for r in shown or []}
+        fresh_ids = {r.get("Id") for r in fresh}
+        gone = [pid for pid in ids if pid in shown_ids and pid not in fresh_ids]
+        if gone:
+            self.console.info(f"Already up to date since the cached scan: {', '.join(gone)}")
+        return [pid for pid in ids if pid not in gone]
+
+    def inventory(self):
+        if self._inventory is None:
+            from ..domain.inventory import Inventory
+            self._inventory = Inventory()
+        return self._inventory
+
+    def _scan_installed(self):
+        full = ["winget","list"]
+        cmds = (full, ["winget","list","--source","winget"], ["winget","list","--source","msstore"])
+        rows, _, cmd = yield from self._scan_table(cmds, 60, keep=lambda r: looks_like_id(r.get("Id","")))
+        if rows and cmd == full:
+            self.inventory().apply(rows)
+            memo = self.memo()
+            memo.evict(r["Id"] for r in rows)
+            memo.save()
+        return rows
+
+    def iter_installed(self, refresh: bool=False):
+        """Serves the inventory without running winget and rescans in the background past `inventory_ttl_minutes`."""
+        inv = self.inventory()
+        age = inv.age_s()
+        if age is not None and not refresh:
+            rows = inv.rows()
+            if age > self.inventory_ttl_min * 60 and not self.proc.dry_run:
+                self.start_inventory_refresh()
+            yield from rows
+            return rows
+        rows = yield from self._scan_installed()
+        return rows if rows is not None else []
+
+    def start_inventory_refresh(self):
+        if self._inv_refresh is not None and self._inv_refresh.is_alive(): return
+        def run():
+            try: drain(self._scan_installed())
+            except Exception: pass
+        self._inv_refresh = threading.Thread(target=run, name="inventory-refresh", daemon=True)
+        self._inv_refresh.start()
+
+    def search_installed(self, text: str):
+        inv = self.inventory()
+        return inv.search(text) if inv.age_s() is not None else []
+
+    @trace.traced()
+    def list_upgrades(self, on_row=None, stale_ok: bool=False):
+        if on_row is not None:
+            return drain(self.iter_upgrades(stale_ok), on_row)
         spin = Spinner(prefix="Scanning for app updates")
         spin.start(" via winget")
         try:
-            if self._json_supported():
-                rc,out,timeout = self.proc.run_capture_timeout(["winget","upgrade","--output","json"], 60)
-                if rc==0 and not timeout and out:
-                    try:
-                        data = json.loads(out)
-                        def mapit(p):
-                            return {
-                                "Id": p.get("PackageIdentifier") or p.get("Id") or "",
-                                "Name": p.get("PackageName") or p.get("Name") or "",
-                                "Version": p.get("InstalledVersion") or p.get("Version") or "",
-                                "Available": p.get("AvailableVersion") or p.get("Available") or "",
-                                "Source": p.get("Source") or "",
-                            }
-                        arr = data.get("InstalledPackages", []) if isinstance(data, dict) else data
-                        rows = [x for x in map(mapit, arr) if x["Id"]]
-                        if rows:
-                            self._cache_write(rows)
-                            return rows
-                    except json.JSONDecodeError:
-                        pass
-            for cmd in (["winget","upgrade"], ["winget","upgrade","--include-unknown"]):
-                rc,out,timeout = self.proc.run_capture_timeout(cmd, 45)
-                if rc==0 and not timeout and out:
-                    rows = self._parse_table(out)
-                    if rows:
-                        self._cache_write(rows)
-                        return rows
-            return []
+            return drain(self.iter_upgrades(stale_ok))
         finally:
             spin.stop()
 
-    def list_installed(self):
+    @trace.traced()
+    def list_installed(self, on_row=None, refresh: bool=False):
+        if on_row is not None:
+            return drain(self.iter_installed(refresh), on_row)
         spin = Spinner(prefix="Reading installed apps")
         spin.start(" via winget")
         try:
-            for cmd in (["winget","list"], ["winget","list","--source","winget"], ["winget","list","--source","msstore"]):
-                rc,out,timeout = self.proc.run_capture_timeout(cmd, 60)
-                if rc==0 and not timeout and out:
-                    rows = [r for r in self._parse_table(out) if looks_like_id(r.get("Id",""))]
-                    if rows: return rows
-            return []
+            return drain(self.iter_installed(refresh))
         finally:
             spin.stop()
 
-    def update_ids(self, ids: list[str]):
+    def _start_prefetch(self, ids: list[str]):
+        from .prefetch import Prefetcher
+        d = self.cfg.get_defaults()
+        pf = Prefetcher(self.proc, CONFIG_DIR / "staging",
+                        depth=int(d.get("prefetch_depth", 2)),
+                        disk_cap_mb=int(d.get("prefetch_disk_cap_mb", 4096)),
+                        workers=int(d.get("prefetch_workers", 2)))
+        pf.start(ids)
+        return pf
+
+    def _upgrade_base(self, pid: str, src: str):
+        base = ["winget","upgrade","--id",pid,"--accept-package-agreements","--accept-source-agreements"]
+        if pid in self._unknown_version:
+            base += ["--include-unknown"]
+        if src in ("msstore","store"):
+            base += ["--source","msstore"]
+        return base
+
+    def _split_by_installer(self, plan, jobs: int, versions: dict | None=None):
+        from concurrent.futures import ThreadPoolExecutor
+        from .installpool import detect_installer_type, install_class
+        from ..domain.probe_cache import ProbeCache
+        versions = versions or {}
+        cache = ProbeCache()
+        key = self.capabilities().get("version") or "unknown"
+        seen = cache.get("installer_types", key, None) or {}
+        for pid, src in plan:
+            e = seen.get(pid.lower())
+            if pid not in self._installer_types and e and versions.get(pid) and e.get("version") == versions[pid]:
+                self._installer_types[pid] = e["type"]
+        unknown = [pid for pid, src in plan if src not in ("msstore","store") and pid not in self._installer_types]
+        if unknown:
+            with ThreadPoolExecutor(max_workers=min(8, max(jobs, 4), len(unknown)), thread_name_prefix="show") as ex:
+                for pid, kind in zip(unknown, ex.map(lambda x: detect_installer_type(self.proc, x), unknown)):
+                    self._installer_types[pid] = kind
+                    if kind and versions.get(pid):
+                        seen[pid.lower()] = {"type": kind, "version": versions[pid]}
+            cache.put("installer_types", key, seen)
+        parallel, exclusive = [], []
+        for pid, src in plan:
+            if src not in ("msstore","store") and install_class(self._installer_types.get(pid, "")) == "parallel":
+                parallel.append((pid, src))
+            else:
+                exclusive.append((pid, src))
+        return parallel, exclusive
+
+    def _attempt(self, results: dict, pid: str, kind: str, fn, *args):
+        rec = results["packages"].get(pid)
+        t0, p0, seq = time.time(), time.perf_counter(), resources.mark()
+        with trace.tag(package=pid, attempt=kind):
+            out = fn(*args)
+        if rec is not None:
+            rc = out[0] if isinstance(out, tuple) else out
+            end = time.time()
+            used = resources.since(seq, tid=threading.get_ident())
+            attempt = {"kind": kind, "rc": rc, "duration_s": round(time.perf_counter() - p0, 3),
+                       "usage": resources.aggregate(used) if used else None}
+            if rc:
+                verdict = exitcodes.classify(rc)
+                attempt.update(code=verdict["label"], reason=verdict["reason"])
+            rec["attempts"].append(attempt)
+            rec["started_at"] = rec["started_at"] or _stamp(t0)
+            rec["finished_at"] = _stamp(end)
+            rec["_t"] = (rec["_t"][0] if rec["_t"] else t0, end)
+        return out
+
+    def _install_captured(self, pid: str, src: str, results: dict):
+        return self._attempt(results, pid, "parallel", self.proc.run_capture, self._upgrade_base(pid, src) + ["--silent"])
+
+    def _collect_parallel(self, pool, sources: dict, results: dict, block: bool=False):
+        for pid, rc, out in pool.drain(block=block):
+            self.console.info(f"[{pid}] {self._installer_types.get(pid) or 'package'} install output:")
+            for ln in (out or "").splitlines():
+                if ln.strip(): print(f"    {ln.rstrip()}")
+            if rc == 0:
+                self.console.ok(f"Updated (or already current): {pid}")
+                results["updated"].append(pid)
+                self._remember(pid, "silent", results)
+            else:
+                self._install_one(pid, sources.get(pid, ""), results, skip_silent=True, silent_rc=rc)
+
+    def _settle(self, pid: str, verdict: dict, results: dict, ok_key: str="updated") -> bool:
+        """Ends the fallback chain for exit codes whose outcome is already known; False means try the next step."""
+        action, reason = verdict["action"], verdict["reason"]
+        if action == exitcodes.DONE:
+            self.console.ok(f"Updated: {pid}" + (f" ({reason})" if reason else ""))
+            results[ok_key].append(pid)
+            results["reboot_required"] = results["reboot_required"] or verdict["reboot"]
+        elif action == exitcodes.CURRENT:
+            self.console.info(f"{pid}: {reason}.")
+            results["current"].append(pid)
+        elif action in (exitcodes.RETRY_LATER, exitcodes.RETRY_AFTER_CLOSE):
+            self.console.warn(f"{pid}: {reason}; deferred to the next run.")
+            results["deferred"].append(pid)
+        elif action == exitcodes.GIVE_UP:
+            self.console.warn(f"{pid}: {reason}; not retrying.")
+            results["failed"].append(pid)
+        else:
+            return False
+        rec = results["packages"].get(pid)
+        if rec is not None and reason:
+            rec["code"], rec["reason"] = verdict["label"], reason
+        return True
+
+    def _install_one(self, pid: str, src: str, results: dict, prefetch=None, skip_silent: bool=False, silent_rc: int | None=None):
+        base = self._upgrade_base(pid, src)
+        if skip_silent:
+            self.console.info(f"{pid}: silent update failed.")
+        else:
+            self.console.info(f"Updating {pid} ...")
+        store = src in ("msstore","store")
+        order = ["silent"] if store else self.memo().order(pid)
+        staged = prefetch.take(pid) if prefetch and order[0] == "silent" and not skip_silent else None
+        if staged:
+            from .prefetch import staged_install_cmd
+            try:
+                cmd, info = staged_install_cmd(staged)
+                if cmd:
+                    try:
+                        rc = self._attempt(results, pid, "prefetched", self.proc.run_stream_progress, cmd, f"Installing {pid} (prefetched)")
+                    except OSError:
+                        rc = 1
+                    verdict = exitcodes.classify(rc)
+                    if rc == 0 or verdict["code"] in info["success_codes"] or verdict["action"] == exitcodes.DONE:
+                        self.console.ok(f"Updated (prefetched installer): {pid}" + (f" ({verdict['reason']})" if verdict["reason"] else ""))
+                        results["updated"].append(pid)
+                        results["reboot_required"] = results["reboot_required"] or verdict["reboot"]
+                        self._remember(pid, "silent", results)
+                        return
+                    self.console.info(f"{pid}: prefetched installer failed; falling back to winget…")
+            finally:
+                prefetch.release(pid)
+        elif prefetch:
+            prefetch.release(pid)
+        if order[0] != "silent":
+            self.console.info(f"{pid}: trying {order[0]} first (it worked last time).")
+        notes = {"silent": "retrying silent…", "interactive": "retrying interactive…", "reinstall": "trying reinstall…"}
+        done = {"silent": f"Updated (or already current): {pid}", "interactive": f"Updated interactively: {pid}", "reinstall": f"Reinstalled: {pid}"}
+        cmds = {
+            "silent": (base + ["--silent"], f"Installing {pid}"),
+            "interactive": ([c for c in base if c!="--silent"] + ["--interactive"], f"Installing {pid} (interactive)"),
+            "reinstall": (["winget","install","--id",pid,"--accept-package-agreements","--accept-source-agreements","--silent"], f"Reinstalling {pid}"),
+        }
+        ok_keys = {"silent": "updated", "interactive": "interactive", "reinstall": "reinstalled"}
+        skip = set()
+        for i, step in enumerate(order):
+            if step in skip: continue
+            if step == "silent" and skip_silent:
+                rc = silent_rc
+            else:
+                if step != order[0]:
+                    self.console.info(f"{pid}: {notes[step]}")
+                rc = self._attempt(results, pid, step, self.proc.run_stream_progress, *cmds[step])
+            if rc == 0:
+                self.console.ok(done[step])
+                results[ok_keys[step]].append(pid)
+                self._remember(pid, step, results)
+                return
+            if rc is None:
+                continue
+            verdict = exitcodes.classify(rc)
+            if step == "silent" and verdict["action"] == exitcodes.RETRY_AFTER_CLOSE and self.in_use_retry_s > 0 and not store:
+                self.console.warn(f"{pid}: {verdict['reason']}. Close it; retrying in {self.in_use_retry_s} s…")
+                time.sleep(self.in_use_retry_s)
+                rc = self._attempt(results, pid, "silent", self.proc.run_stream_progress, *cmds["silent"])
+                if rc == 0:
+                    self.console.ok(f"Updated: {pid}")
+                    results["updated"].append(pid)
+                    self._remember(pid, "silent", results)
+                    return
+                verdict = exitcodes.classify(rc)
+            last = i == len(order) - 1 and not store
+            if last and verdict["action"] in (exitcodes.UNKNOWN, exitcodes.REINSTALL):
+                verdict = {**verdict, "action": exitcodes.GIVE_UP}
+            if self._settle(pid, verdict, results, ok_key=ok_keys[step]):
+                if verdict["action"] == exitcodes.DONE:
+                    self._remember(pid, step, results)
+                elif verdict["action"] == exitcodes.GIVE_UP:
+                    self._remember(pid, None, results)
+                return
+            if verdict["action"] == exitcodes.REINSTALL:
+                skip.add("interactive")
+        if store:
+            self.console.warn(f"{pid}: Store upgrade failed. Open Microsoft Store → Library → Get updates.")
+            results["failed"].append(pid)
+            return
+        self.console.warn(f"Failed or not applicable: {pid}")
+        results["failed"].append(pid)
+        self._remember(pid, None, results)
+
+    def memo(self):
+        if self._memo is None:
+            from ..domain.strategies import StrategyMemo
+            self._memo = StrategyMemo(retest_days=float(self.cfg.get_defaults().get("strategy_retest_days", 14)))
+        return self._memo
+
+    def _remember(self, pid: str, strategy: str | None, results: dict):
+        rec = results["packages"].get(pid) or {}
+        tries = rec.get("attempts") or []
+        self.memo().record(pid, strategy, tries[-1]["duration_s"] if strategy and tries else None)
+
+    def _lookup_row(self, pid: str):
+        with trace.tag(package=pid):
+            rc, out, timeout = self.proc.run_capture_timeout(["winget","list","--id",pid,"--exact","--accept-source-agreements"], 30)
+        if rc != 0 or timeout or not out:
+            return None
+        for r in self._parse_table(out):
+            if r["Id"].lower() == pid.lower():
+                return r
+        return None
+
+    def _resolve_rows(self, ids: list[str], rows=None) -> dict:
+        """Rows for `ids` from the caller's rows, the scan cache, the inventory, then `winget list --id` per id still unknown."""
+        found = {}
+        wanted = set(ids)
+        for r in rows or []:
+            if r.get("Id") in wanted:
+                found[r["Id"]] = r
+        missing = [pid for pid in ids if pid not in found]
+        if missing:
+            with self._cache_lock:
+                entries = self._cache_load()["entries"].values()
+            for e in entries:
+                for r in e.get("rows") or []:
+                    if r.get("Id") in wanted and r["Id"] not in found:
+                        found[r["Id"]] = r
+            missing = [pid for pid in ids if pid not in found]
+        if missing and self.inventory().age_s() is not None:
+            for pid, r in self.inventory().lookup(missing).items():
+                found[pid] = {**r, "Id": pid}
+            missing = [pid for pid in ids if pid not in found]
+        if missing and not self.proc.dry_run:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=min(4, len(missing)), thread_name_prefix="source") as pool:
+                for pid, r in zip(missing, pool.map(self._lookup_row, missing)):
+                    if r is not None: found[pid] = r
+        return found
+
+    def _batch_candidates(self, plan) -> dict:
+        """The winget-source part of the plan, if it covers every upgradable winget row a scan in this run found."""
+        if not self._live_rows:
+            return {}
+        upgradable, _ = partition_current(self._live_rows)
+        scope = {r["Id"] for r in upgradable if (r.get("Source") or "").lower() == "winget" and r["Id"] not in self._unknown_version}
+        planned = dict(plan)
+        if len(scope) < 2 or not scope <= planned.keys():
+            return {}
+        return {pid: planned[pid] for pid in scope}
+
+    @trace.traced()
+    def _run_batch(self, batched: dict, results: dict, timings: dict):
+        t, t0 = time.perf_counter(), time.time()
+        cmd = ["winget","upgrade","--all","--silent","--source","winget","--accept-package-agreements","--accept-source-agreements"]
+        self.console.info(f"Upgrading {len(batched)} package(s) in one winget call…")
+        rc = self.proc.run_stream_progress(cmd, label=f"Upgrading {len(batched)} packages (batch)")
+        timings["batch_s"] = round(time.perf_counter() - t, 3)
+        timings["batch_rc"] = rc
+        for pid in batched:
+            rec = results["packages"].get(pid)
+            if rec is not None:
+                rec["attempts"].append({"kind": "batch", "rc": rc, "duration_s": timings["batch_s"], "shared_with": len(batched)})
+                rec["started_at"], rec["finished_at"] = _stamp(t0), _stamp(t0 + timings["batch_s"])
+                rec["_t"] = (t0, t0 + timings["batch_s"])
+        if self.proc.dry_run:
+            results["updated"].extend(batched)
+            return
+        t = time.perf_counter()
+        self._probe_rows = None
+        rescan = drain(self._scan_upgrades())
+        timings["rescan_s"] = round(time.perf_counter() - t, 3)
+        t = time.perf_counter()
+        if rescan is None:
+            self.console.warn("Could not rescan after the batch upgrade; checking each package on its own.")
+            for pid, src in batched.items():
+                self._install_one(pid, src, results)
+            timings["fallbacks"] = len(batched)
+            timings["fallback_s"] = round(time.perf_counter() - t, 3)
+            return
+        still, _ = partition_current(rescan)
+        remaining = {r["Id"] for r in still}
+        for pid, src in batched.items():
+            if pid not in remaining:
+                self.console.ok(f"Updated (batch): {pid}")
+                results["updated"].append(pid)
+            else:
+                self._install_one(pid, src, results, skip_silent=True)
+        timings["fallbacks"] = len(remaining & batched.keys())
+        timings["fallback_s"] = round(time.perf_counter() - t, 3)
+
+    @trace.traced()
+    def update_ids(self, ids: list[str], pipeline: bool | None=None, jobs: int | None=None, rows=None, batch: bool | None=None):
         results = {
             "updated": [], "interactive": [], "reinstalled": [],
-            "skipped": [], "store_skipped": [], "failed": []
+            "skipped": [], "store_skipped": [], "failed": [], "current": [], "deferred": [],
+            "reboot_required": False, "timings": {}, "packages": {}
         }
         self.console.header("Installing selected app updates (winget)")
-        id_to_source = {}
-        rc,out = self.proc.run_capture(["winget","upgrade"])
-        if rc==0 and out:
-            for r in self._parse_table(out):
-                id_to_source[r["Id"]] = (r.get("Source","") or "").lower()
+        stamp_before = install_state_stamp()
+        known = self._resolve_rows([pid for pid in ids if looks_like_id(pid) and not looks_like_version(pid)], rows)
+        _, current = partition_current(known.values())
+        current_ids = {r["Id"] for r in current}
+        self._unknown_version = {pid for pid, r in known.items() if is_unknown(r.get("Version") or "") and r.get("Version")}
         user_ctx = not self.console.is_admin()
+        plan = []
         for pid in ids:
             if not looks_like_id(pid) or looks_like_version(pid):
                 self.console.warn(f"Skipping invalid Id (looks like a version or malformed): {pid}")
                 results["skipped"].append(pid)
                 continue
-            src = id_to_source.get(pid,"")
-            base = ["winget","upgrade","--id",pid,"--accept-package-agreements","--accept-source-agreements"]
-            if src in ("msstore","store"):
-                if not user_ctx:
-                    self.console.warn(f"{pid} is a Microsoft Store app. Run in a NON-admin terminal and retry.")
-                    results["store_skipped"].append(pid)
-                    continue
-                base += ["--source","msstore"]
-            cmd_silent = base + ["--silent"]
-            self.console.info(f"Updating {pid} ...")
-            rc = self.proc.run_stream_progress(cmd_silent, label=f"Installing {pid}")
-            if rc == 0:
-                self.console.ok(f"Updated (or already current): {pid}")
-                results["updated"].append(pid)
+            r = known.get(pid) or {}
+            results["packages"][pid] = {
+                "id": pid, "source": (r.get("Source") or "").lower(), "version": r.get("Version") or "", "available": r.get("Available") or "",
+                "outcome": None, "started_at": None, "finished_at": None, "duration_s": None, "attempts": [], "_t": None,
+            }
+            if pid in current_ids:
+                self.console.info(f"{pid}: already current ({r.get('Version')} installed, {r.get('Available')} available).")
+                results["current"].append(pid)
                 continue
-            if src in ("msstore","store"):
-                self.console.warn(f"{pid}: Store upgrade failed. Open Microsoft Store → Library → Get updates.")
-                results["failed"].append(pid)
+            src = (known.get(pid, {}).get("Source","") or "").lower()
+            if src in ("msstore","store") and not user_ctx:
+                self.console.warn(f"{pid} is a Microsoft Store app. Run in a NON-admin terminal and retry.")
+                results["store_skipped"].append(pid)
                 continue
-            self.console.info(f"{pid}: retrying interactive…")
-            cmd_interactive = [c for c in base if c!="--silent"] + ["--interactive"]
-            rc2 = self.proc.run_stream_progress(cmd_interactive, label=f"Installing {pid} (interactive)")
-            if rc2 == 0:
-                self.console.ok(f"Updated interactively: {pid}")
-                results["interactive"].append(pid)
-            else:
-                self.console.info(f"{pid}: trying reinstall…")
-                rc3 = self.proc.run_stream_progress(["winget","install","--id",pid,"--accept-package-agreements","--accept-source-agreements","--silent"], label=f"Reinstalling {pid}")
-                if rc3 == 0:
-                    self.console.ok(f"Reinstalled: {pid}")
-                    results["reinstalled"].append(pid)
-                else:
-                    self.console.warn(f"Failed or not applicable: {pid}")
-                    results["failed"].append(pid)
-        return results
\ No newline at end of file
+            plan.append((pid, src))
+        d = self.cfg.get_defaults()
+        if pipeline is None:
+            pipeline = bool(d.get("pipeline_downloads"))
+        if jobs is None:
+            jobs = int(d.get("install_jobs", 1) or 1)
+        if batch is None:
+            batch = bool(d.get("batch_upgrades"))
+        t_start = time.perf_counter()
+        timings = {"mode": "per_id", "packages": len(plan)}
+        results["timings"] = timings
+        batched = self._batch_candidates(plan) if batch else {}
+        if batch and not batched:
+            self.console.info("Batch mode needs the complete upgrade list from a scan in this run; installing per package.")
+        if batched:
+            timings["mode"] = "batch"
+            timings["batched"] = len(batched)
+            plan = [(pid, src) for pid, src in plan if pid not in batched]
+        parallel, exclusive = [], plan
+        if jobs > 1 and len(plan) > 1 and not self.proc.dry_run:
+            parallel, exclusive = self._split_by_installer(plan, jobs, {pid: results["packages"][pid]["available"] for pid, src in plan})
+            memo = self.memo()
+            learned = [(pid, src) for pid, src in parallel if memo.order(pid)[0] != "silent"]
+            if learned:
+                parallel = [p for p in parallel if p not in learned]
+                exclusive = exclusive + learned
+        prefetch = None
+        if pipeline and not self.proc.dry_run:
+            memo = self.memo()
+            prefetch = self._start_prefetch([pid for pid, src in exclusive if src not in ("msstore","store") and memo.order(pid)[0] == "silent"])
+        pool = None
+        if parallel:
+            from .installpool import InstallPool
+            pool = InstallPool(jobs)
+        sources = dict(plan)
+        try:
+            if batched:
+                self._run_batch(batched, results, timings)
+            if pool:
+                self.console.info(f"Installing {len(parallel)} parallel-safe package(s) on {jobs} workers…")
+                for pid, src in parallel:
+                    pool.submit(pid, self._install_captured, pid, src, results)
+            for pid, src in exclusive:
+                self._install_one(pid, src, results, prefetch)
+                if pool: self._collect_parallel(pool, sources, results)
+            while pool and pool.pending:
+                self._collect_parallel(pool, sources, results, block=True)
+        finally:
+            if prefetch: prefetch.close()
+            if pool: pool.close()
+            done = results["updated"] + results["interactive"] + results["reinstalled"] + results["current"]
+            if done and not self.proc.dry_run:
+                self._cache_forget(done, stamp_before)
+            timings["total_s"] = round(time.perf_counter() - t_start, 3)
+            self._finish_records(results)
+            if not self.proc.dry_run:
+                self.memo().save()
+        return results
+
+    def _finish_records(self, results: dict):
+        for key in ("updated", "interactive", "reinstalled", "store_skipped", "failed", "current", "deferred"):
+            for pid in results[key]:
+                rec = results["packages"].get(pid)
+                if rec is not None: rec["outcome"] = key
+        for rec in results["packages"].values():
+            span = rec.pop("_t", None)
+            if span: rec["duration_s"] = round(span[1] - span[0], 3)
+        results["packages"] = list(results["packages"].values())
@@ -3,12 +3,14 @@ import shutil
 import tempfile
 from pathlib import Path
 from ..core.console import Console
+from ..core.powershell import result_of
 
 class DiagnosticsService:
     """
     Creates a local, opt-in diagnostics zip with:
-      - environment info (OS, PowerShell version, winget version)
-      - winget list/upgrade outputs
+      - environment info (OS, PowerShell version, winget version; env.json and env.txt)
+      - winget upgrade output and the installed-package inventory
+        (or `winget list` output when there is no inventory yet)
       - current config (profiles)
       - current run report (JSON/TXT)
     No data is uploaded anywhere automatically.
@@ -35,22 +37,29 @@ class DiagnosticsService:
             # 1) Basic environment info
             self.console.info("Collecting environment info for diagnostics…")
             ps_env_script = r'''
-$psv = $PSVersionTable.PSVersion.ToString()
-$osv = (Get-CimInstance Win32_OperatingSystem).Caption + " " + (Get-CimInstance Win32_OperatingSystem).Version
-Write-Host "PowerShell: $psv"
-Write-Host "Windows: $osv"
+$os = Get-CimInstance Win32_OperatingSystem
+Send-SenseiEvent result @{
+  powershell = $PSVersionTable.PSVersion.ToString(); edition = [string]$PSVersionTable.PSEdition
+  windows = [string]$os.Caption; version = [string]$os.Version; build = [string]$os.BuildNumber; arch = [string]$os.OSArchitecture
+}
 '''
-            rc, out = self.app.proc.run_capture([self.app.proc and "powershell.exe" or "powershell.exe",
-                                                 "-NoLogo","-NoProfile","-NonInteractive","-ExecutionPolicy","Bypass",
-                                                 "-Command", ps_env_script])
-            self._write_text(tmpdir / "env.txt", out or "")
+            rc, events = self.system.ps.events(ps_env_script, echo=False)
+            env = result_of(events)
+            self._write_text(tmpdir / "env.json", json.dumps(env, indent=2))
+            self._write_text(tmpdir / "env.txt", f"PowerShell: {env.get('powershell', '')}\nWindows: {env.get('windows', '')} {env.get('version', '')}\n" if env else "")
 
             self._capture_cmd("winget_version.txt", ["winget","--version"], tmpdir)
 
             # 2) winget outputs
             self.console.info("Capturing winget state…")
             self._capture_cmd("winget_upgrade.txt", ["winget","upgrade"], tmpdir)
-            self._capture_cmd("winget_list.txt", ["winget","list"], tmpdir)
+            inv = self.app.inventory()
+            snap = inv.last_snapshot()
+            if snap:
+                payload = {"snapshot_ts": snap["ts"], "packages": inv.rows(), "changes_30d": inv.changes_since(snap["ts"] - 30 * 86400)}
+                self._write_text(tmpdir / "installed_inventory.json", json.dumps(payload, indent=2))
+            else:
+                self._capture_cmd("winget_list.txt", ["winget","list"], tmpdir)
 
             # 3) config snapshot
             cfg_text = json.dumps(self.cfg.data, indent=2)
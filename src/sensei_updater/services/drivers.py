@@ -1,111 +1,255 @@
-from ..core.powershell import PowerShell
+import json, re, time
+from ..core import trace
+from ..core.colors import *
+from ..core.powershell import PowerShell, events_of, result_of
 from ..core.process import Process
 from ..core.admin import require_admin_or_msg
+from ..data.paths import CONFIG_DIR
+from ..domain.probe_cache import boot_session_id
 
-class DriverService:
-    def __init__(self, console):
-        self.console = console
-        self.proc = Process(debug=console.debug, dry_run=console.dry_run)
-        self.ps = PowerShell(self.proc)
+ROW_FIELDS = ("Title", "KB", "Size", "UpdateId", "Manufacturer")
+UPDATE_ID_RX = re.compile(r"^[0-9A-Fa-f]{8}-[0-9A-Fa-f]{4}-[0-9A-Fa-f]{4}-[0-9A-Fa-f]{4}-[0-9A-Fa-f]{12}$")
 
-    def _ensure_pswindowsupdate(self) -> bool:
-        self.console.header("Preparing PowerShell + PSWindowsUpdate")
-        self.console.info("Installing NuGet/PSWindowsUpdate if needed...")
-        ps = r'''
-if (-not (Get-PackageProvider -Name NuGet -ListAvailable -ErrorAction SilentlyContinue)) {
+SCAN_PS = r'''
+Import-Module PSWindowsUpdate -Force
+try { Add-WUServiceManager -MicrosoftUpdate -Confirm:$false | Out-Null } catch { }
+$drivers = $null
+try {
+  $drivers = Get-WindowsUpdate -MicrosoftUpdate -Category 'Drivers' -ErrorAction Stop
+} catch {
+  if (Get-Command Get-WUList -ErrorAction SilentlyContinue) {
+    $drivers = Get-WUList -MicrosoftUpdate -Category Drivers
+  } else { throw }
+}
+$global:SenseiDriverScan = @($drivers | Where-Object { $_ })
+foreach ($d in $global:SenseiDriverScan) {
+  Send-SenseiEvent row @{
+    Title = [string]$d.Title; KB = [string]$d.KB; Size = [string]$d.Size
+    UpdateId = [string]$d.Identity.UpdateID; Manufacturer = [string]$d.DriverManufacturer
+  }
+}
+Send-SenseiEvent result @{ count = $global:SenseiDriverScan.Count }
+'''
+
+INSTALL_PS = r'''
+Import-Module PSWindowsUpdate -Force
+$ids = @(__IDS__)
+$ok = $true
+$reboot = $false
+$cached = @($global:SenseiDriverScan | Where-Object { $_ -and ($ids -contains [string]$_.Identity.UpdateID) })
+if ($cached.Count -eq $ids.Count) {
+  $coll = New-Object -ComObject Microsoft.Update.UpdateColl
+  foreach ($u in $cached) { if (-not $u.EulaAccepted) { $u.AcceptEula() }; [void]$coll.Add($u) }
+  $session = New-Object -ComObject Microsoft.Update.Session
+  Send-SenseiEvent progress @{ message = "Downloading $($coll.Count) driver update(s)..." }
+  $dl = $session.CreateUpdateDownloader(); $dl.Updates = $coll; [void]$dl.Download()
+  Send-SenseiEvent progress @{ message = "Installing $($coll.Count) driver update(s)..." }
+  $inst = $session.CreateUpdateInstaller(); $inst.Updates = $coll
+  $res = $inst.Install()
+  for ($i = 0; $i -lt $coll.Count; $i++) {
+    $r = $res.GetUpdateResult($i)
+    $done = ($r.ResultCode -eq 2 -or $r.ResultCode -eq 3)
+    if (-not $done) { $ok = $false }
+    Send-SenseiEvent update @{ id = [string]$coll.Item($i).Identity.UpdateID; ok = $done; hresult = [int64]$r.HResult }
+  }
+  if ($res.RebootRequired) { $reboot = $true }
+  $via = "session"
+} else {
+  Send-SenseiEvent progress @{ message = "Scan is not in this session; installing by UpdateID." }
+  $last = @{}
+  try {
+    foreach ($o in @(Install-WindowsUpdate -MicrosoftUpdate -UpdateID $ids -AcceptAll -IgnoreReboot)) {
+      $oid = [string]$o.Identity.UpdateID
+      if ($oid) { $last[$oid] = [string]$o.Result }
+    }
+  } catch {
+    Send-SenseiEvent error @{ message = "Install-WindowsUpdate failed: " + $_.Exception.Message }
+  }
+  foreach ($id in $ids) {
+    $r = $last[$id]
+    $done = ($r -eq "Installed")
+    if (-not $done) { $ok = $false }
+    Send-SenseiEvent update @{ id = $id; ok = $done; result = $(if ($r) { $r } else { "NotReported" }) }
+  }
+  try { if (Get-WURebootStatus -Silent) { $reboot = $true } } catch { }
+  $via = "lookup"
+}
+Send-SenseiEvent result @{ ok = $ok; reboot = $reboot; via = $via }
+'''
+
+MODULE_PROBE_PS = r'''
+$m = Get-Module -ListAvailable -Name PSWindowsUpdate | Sort-Object Version -Descending | Select-Object -First 1
+Send-SenseiEvent result @{ version = $(if ($m) { [string]$m.Version } else { $null }) }
+'''
+
+BOOTSTRAP_PS = r'''
+$nuget = [bool](Get-PackageProvider -Name NuGet -ListAvailable -ErrorAction SilentlyContinue)
+if (-not $nuget) {
+  Send-SenseiEvent progress @{ message = "Installing the NuGet package provider..." }
   Install-PackageProvider -Name NuGet -Force -Scope AllUsers | Out-Null
+  $nuget = $true
 }
 try {
   $repo = Get-PSRepository -Name "PSGallery" -ErrorAction Stop
   if ($repo.InstallationPolicy -ne "Trusted") {
+    Send-SenseiEvent progress @{ message = "Trusting PSGallery..." }
     Set-PSRepository -Name "PSGallery" -InstallationPolicy Trusted
   }
 } catch {
+  Send-SenseiEvent progress @{ message = "Registering PSGallery..." }
   Register-PSRepository -Name "PSGallery" -SourceLocation "https://www.powershellgallery.com/api/v2" -InstallationPolicy Trusted
 }
 if (-not (Get-Module -ListAvailable -Name PSWindowsUpdate)) {
+  Send-SenseiEvent progress @{ message = "Installing PSWindowsUpdate..." }
   Install-Module -Name PSWindowsUpdate -Force -Scope AllUsers -AllowClobber | Out-Null
 }
 Import-Module PSWindowsUpdate -Force
-Write-Host "PSWindowsUpdate is ready."
+$m = Get-Module -ListAvailable -Name PSWindowsUpdate | Sort-Object Version -Descending | Select-Object -First 1
+Send-SenseiEvent result @{ version = [string]$m.Version; nuget = $nuget }
 '''
-        rc = self.ps.run(ps)
-        if rc != 0:
+
+class DriverService:
+    def __init__(self, console, cfg=None, refresh_module: bool=False):
+        self.console = console
+        self.proc = Process(debug=console.debug, dry_run=console.dry_run)
+        self.ps = PowerShell(self.proc)
+        self.cache_path = CONFIG_DIR / "driver-scan.json"
+        d = (cfg.get_defaults() if cfg else None) or {}
+        self.scan_ttl_min = int(d.get("driver_scan_ttl_minutes", 120))
+        self.stamp_days = float(d.get("pswindowsupdate_stamp_days", 7))
+        self.refresh_module = refresh_module
+        self._ready = False
+
+    def _stamp_valid(self) -> bool:
+        from ..domain.probe_cache import ProbeCache, spec_hash
+        stamp = ProbeCache().get("pswindowsupdate", spec_hash(self.ps.exe), self.stamp_days * 86400)
+        if not stamp or not stamp.get("nuget"): return False
+        rc, events = self.ps.events(MODULE_PROBE_PS, echo=False)
+        ver = result_of(events).get("version")
+        return bool(ver) and ver == stamp.get("version")
+
+    def _ensure_pswindowsupdate(self) -> bool:
+        """Runs the full setup only when the readiness stamp is missing, stale or `refresh_module` is set."""
+        if self._ready: return True
+        if not self.refresh_module and not self.proc.dry_run and self._stamp_valid():
+            self._ready = True
+            return True
+        self.console.header("Preparing PowerShell + PSWindowsUpdate")
+        self.console.info("Installing NuGet/PSWindowsUpdate if needed...")
+        rc, events = self.ps.events(BOOTSTRAP_PS, progress=self.console.info)
+        res = result_of(events)
+        if rc != 0 or (not res and not self.proc.dry_run):
             self.console.err("Failed to prepare PSWindowsUpdate.")
             return False
         self.console.ok("PSWindowsUpdate is ready.")
+        if res.get("version") and res.get("nuget"):
+            from ..domain.probe_cache import ProbeCache, spec_hash
+            ProbeCache().put("pswindowsupdate", spec_hash(self.ps.exe), {"version": res["version"], "nuget": True})
+        self._ready = True
         return True
 
+    @trace.traced()
     def create_restore_point(self, desc="Sensei_Restore_Point"):
         if not require_admin_or_msg(self.console, "Create Restore Point"): return False
         self.console.header("Create System Restore Point")
-        rc = self.ps.run(f'''
-try {{
-  Checkpoint-Computer -Description "{desc}" -RestorePointType "MODIFY_SETTINGS"
-  Write-Host "Restore point created."
-}} catch {{
-  Write-Warning "Could not create restore point: $($_.Exception.Message)"
-}}
+        rc, events = self.ps.events(f'''
+Checkpoint-Computer -Description "{desc}" -RestorePointType "MODIFY_SETTINGS" -ErrorAction Stop
+Send-SenseiEvent result @{{ ok = $true }}
 ''')
-        if rc == 0:
+        if rc == 0 and (result_of(events).get("ok") or self.proc.dry_run):
             self.console.ok("Restore point created (or exists today).")
             return True
         else:
+            for e in events_of(events, "error"): self.console.warn(e.get("message") or "")
             self.console.warn("Could not create restore point (is System Protection enabled?).")
             return False
 
+    def _cache_read(self):
+        try:
+            j = json.loads(self.cache_path.read_text(encoding="utf-8"))
+        except Exception:
+            return None
+        if not isinstance(j, dict) or j.get("boot") != boot_session_id():
+            return None
+        if time.time() - float(j.get("ts") or 0) > self.scan_ttl_min * 60:
+            return None
+        return j.get("rows")
+
+    def _cache_write(self, rows):
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.cache_path.with_suffix(self.cache_path.suffix + ".tmp")
+            tmp.write_text(json.dumps({"ts": time.time(), "boot": boot_session_id(), "rows": rows}, indent=2), encoding="utf-8")
+            tmp.replace(self.cache_path)
+        except Exception:
+            pass
+
+    def _cache_forget(self, ids):
+        rows = self._cache_read()
+        if rows is None: return
+        done = {i.lower() for i in ids}
+        self._cache_write([r for r in rows if (r.get("UpdateId") or "").lower() not in done])
+
+    def print_rows(self, rows):
+        print(f"{BOLD}{'#':>3}  {'Title':<60} {'KB':<12} {'Size':>10}{RESET}")
+        for i, r in enumerate(rows, 1):
+            print(f"{i:>3}  {(r.get('Title') or '')[:60]:<60} {(r.get('KB') or '-'):<12} {(r.get('Size') or ''):>10}")
+
+    @trace.traced()
+    def scan_drivers(self, refresh: bool=False):
+        """Driver update rows, or None if the scan failed."""
+        if not refresh:
+            rows = self._cache_read()
+            if rows is not None:
+                self.console.info(f"Using the driver scan from the last {self.scan_ttl_min} min ({len(rows)} update(s)).")
+                return rows
+        if not require_admin_or_msg(self.console, "Driver Updates"): return None
+        if not self._ensure_pswindowsupdate(): return None
+        self.console.info("Scanning for driver updates (this may take a while)...")
+        rc, events = self.ps.events(SCAN_PS, progress=self.console.info, echo=False)
+        if rc != 0 or not (result_of(events) or self.proc.dry_run):
+            for e in events_of(events, "error"): print(e.get("message") or "")
+            self.console.err("Driver scan failed (see output).")
+            return None
+        rows = [{k: r.get(k) or "" for k in ROW_FIELDS} for r in events_of(events, "row") if UPDATE_ID_RX.match(r.get("UpdateId") or "")]
+        if not self.proc.dry_run:
+            self._cache_write(rows)
+        return rows
+
+    @trace.traced()
+    def install_drivers(self, update_ids):
+        """Installs the chosen UpdateIds and returns (success, reboot_hint)."""
+        ids = [i for i in update_ids if UPDATE_ID_RX.match(i or "")]
+        if not ids: return (True, False)
+        if not require_admin_or_msg(self.console, "Driver Updates"): return (False, False)
+        if not self._ensure_pswindowsupdate(): return (False, False)
+        self.console.info(f"Installing {len(ids)} driver update(s)...")
+        rc, events = self.ps.events(INSTALL_PS.replace("__IDS__", ",".join(f"'{i}'" for i in ids)), progress=self.console.info)
+        for e in events_of(events, "error"): self.console.warn(e.get("message") or "")
+        for e in events_of(events, "update"):
+            if not e.get("ok"):
+                why = e.get("result") or f"0x{int(e.get('hresult') or 0) & 0xFFFFFFFF:08X}"
+                self.console.warn(f"{e.get('id')} failed ({why}).")
+        done = [e["id"] for e in events_of(events, "update") if e.get("ok") and e.get("id")]
+        res = result_of(events)
+        success = rc == 0 and (bool(res.get("ok")) or self.proc.dry_run)
+        reboot_hint = bool(res.get("reboot"))
+        if done and not self.proc.dry_run:
+            self._cache_forget(done)
+        if success: self.console.ok(f"Installed {len(done)} driver update(s).")
+        else:       self.console.err("Driver install step failed (see output).")
+        return (success, reboot_hint)
+
+    @trace.traced()
     def update_drivers(self):
         """
         Returns tuple: (success: bool, reboot_hint: bool)
         """
-        if not require_admin_or_msg(self.console, "Driver Updates"): return (False, False)
         self.console.header("Driver Updates via Windows Update (Drivers category)")
-        if not self._ensure_pswindowsupdate(): return (False, False)
-        self.console.info("Scanning for driver updates (this may take a while)...")
-        ps = r'''
-Import-Module PSWindowsUpdate -Force
-try { Add-WUServiceManager -MicrosoftUpdate -Confirm:$false | Out-Null } catch { }
-
-$reboot = $false
-$drivers = $null
-try {
-  $drivers = Get-WindowsUpdate -MicrosoftUpdate -Category 'Drivers' -Verbose -ErrorAction Stop
-} catch {
-  if (Get-Command Get-WUList -ErrorAction SilentlyContinue) {
-    $drivers = Get-WUList -MicrosoftUpdate -Category Drivers -Verbose
-  } else { throw }
-}
-
-if ($drivers -and $drivers.Count -gt 0) {
-  Write-Host "Driver updates found:"
-  $drivers | Select-Object Title, KB, Size | Format-Table -AutoSize
-  $ok = $false
-  try {
-    Install-WindowsUpdate -MicrosoftUpdate -Category 'Drivers' -AcceptAll -AutoReboot:$false -Verbose
-    $ok = $true
-  } catch {
-    try {
-      Install-WindowsUpdate -MicrosoftUpdate -Category Drivers -AcceptAll -IgnoreReboot -Verbose
-      $ok = $true
-    } catch {
-      Write-Warning ("Install-WindowsUpdate failed: " + $_.Exception.Message)
-    }
-  }
-  try {
-    $global:RebootRequired | Out-Null
-    if ($global:RebootRequired) { $reboot = $true }
-  } catch { }
-  if ($ok) { Write-Host "OK:Drivers"; if ($reboot) { Write-Host "REBOOT:True" } }
-  else { Write-Host "OK:Fail" }
-} else {
-  Write-Host "No driver updates available."
-  Write-Host "OK:DriversNone"
-}
-'''
-        rc, out = self.proc.run_capture([self.ps.exe, "-NoLogo","-NoProfile","-NonInteractive","-ExecutionPolicy","Bypass","-Command", ps])
-        print(out or "")
-        success = ("OK:Drivers" in (out or "")) or ("OK:DriversNone" in (out or ""))
-        reboot_hint = "REBOOT:True" in (out or "")
-        if success: self.console.ok("Driver update step finished.")
-        else:       self.console.err("Driver update step failed (see output).")
-        return (success, reboot_hint)
\ No newline at end of file
+        rows = self.scan_drivers()
+        if rows is None: return (False, False)
+        if not rows:
+            self.console.ok("No driver updates available.")
+            return (True, False)
+        self.print_rows(rows)
+        return self.install_drivers([r["UpdateId"] for r in rows])
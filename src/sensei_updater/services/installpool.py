@@ -0,0 +1,54 @@
+import re, queue
+from concurrent.futures import ThreadPoolExecutor
+from ..core import trace
+from ..core.process import Process
+
+PARALLEL_SAFE = {"portable", "zip", "msix", "appx"}
+_TYPE_RX = re.compile(r"^\s*installer\s*-?\s*typ(?:e)?\s*:\s*([A-Za-z]+)", re.I | re.M)
+
+def detect_installer_type(proc: Process, pid: str) -> str:
+    with trace.tag(package=pid):
+        rc, out = proc.run_capture(["winget","show","--id",pid,"--exact","--accept-source-agreements"])
+    if rc != 0 or not out:
+        return ""
+    m = _TYPE_RX.search(out)
+    return m.group(1).lower() if m else ""
+
+def install_class(installer_type: str) -> str:
+    return "parallel" if (installer_type or "").lower() in PARALLEL_SAFE else "exclusive"
+
+class InstallPool:
+    """Runs parallel-safe installs on `jobs` workers; each job's captured output comes back through `drain()`."""
+    def __init__(self, jobs: int):
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(jobs)), thread_name_prefix="install")
+        self._done = queue.Queue()
+        self._pending = 0
+
+    def submit(self, pid: str, fn, *args):
+        self._pending += 1
+        def run():
+            try:
+                rc, out = fn(*args)
+            except Exception as e:
+                rc, out = 1, str(e)
+            self._done.put((pid, rc, out))
+        self._pool.submit(run)
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def drain(self, block: bool=False):
+        items = []
+        while self._pending:
+            try:
+                item = self._done.get(block=block)
+            except queue.Empty:
+                break
+            self._pending -= 1
+            items.append(item)
+            block = False
+        return items
+
+    def close(self):
+        self._pool.shutdown(wait=True)
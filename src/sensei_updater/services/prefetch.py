@@ -0,0 +1,235 @@
+import re, shutil, threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from ..core import trace
+from ..core.process import Process
+
+DEFAULT_SILENT = {
+    "inno": ["/VERYSILENT", "/SUPPRESSMSGBOXES", "/NORESTART", "/SP-"],
+    "nullsoft": ["/S"],
+    "burn": ["/quiet", "/norestart"],
+}
+
+def _dir_bytes(path: Path) -> int:
+    total = 0
+    for p in path.rglob("*"):
+        try:
+            if p.is_file(): total += p.stat().st_size
+        except OSError:
+            pass
+    return total
+
+TYPE_EXTS = {"msi": ".msi", "wix": ".msi", "inno": ".exe", "nullsoft": ".exe", "burn": ".exe", "exe": ".exe"}
+
+def _codes(text: str, key: str) -> set:
+    m = re.search(rf"^\s*{key}:\s*\[([^\]]*)\]", text, re.M)
+    if m:
+        items = m.group(1).split(",")
+    else:
+        m = re.search(rf"^(\s*){key}:\s*\n((?:\1\s*-\s*.+\n?)+)", text, re.M)
+        items = re.findall(r"-\s*(.+)", m.group(2)) if m else []
+    out = set()
+    for x in items:
+        try: out.add(int(x.strip().strip("'\""), 0) & 0xFFFFFFFF)
+        except ValueError: pass
+    return out
+
+def _fields(text: str) -> dict:
+    out = {}
+    m = re.search(r"^\s*InstallerType:\s*['\"]?([A-Za-z]+)", text, re.M)
+    if m: out["installer_type"] = m.group(1).lower()
+    m = re.search(r"^\s*Silent:\s*(.+)$", text, re.M)
+    if m: out["silent"] = m.group(1).strip().strip("'\"")
+    m = re.search(r"^\s*InstallerUrl:\s*['\"]?([^'\"\s]+)", text, re.M)
+    if m: out["installer_url"] = m.group(1)
+    m = re.search(r"^\s*Architecture:\s*['\"]?([A-Za-z0-9]+)", text, re.M)
+    if m: out["architecture"] = m.group(1).lower()
+    codes = _codes(text, "InstallerSuccessCodes")
+    if codes: out["success_codes"] = codes
+    return out
+
+def _split_installers(text: str):
+    root, entries, cur, inside, indent = [], [], None, False, None
+    for ln in text.splitlines(keepends=True):
+        if not inside:
+            if re.match(r"^Installers:\s*$", ln): inside = True
+            else: root.append(ln)
+            continue
+        if ln.strip() and not ln[0].isspace() and not ln.startswith("-"):
+            inside = False
+            root.append(ln)
+            continue
+        m = re.match(r"^(\s*)- ", ln)
+        if m and (indent is None or len(m.group(1)) == indent):
+            indent = len(m.group(1))
+            cur = []
+            entries.append(cur)
+            ln = ln[:indent] + "  " + ln[indent + 2:]
+        if cur is not None: cur.append(ln)
+    return "".join(root), ["".join(e) for e in entries]
+
+def read_manifest(stage: Path):
+    info = {"installer_type": "", "silent": "", "manifest": None, "installer_url": "", "architecture": "", "success_codes": set(), "installers": []}
+    manifests = sorted(stage.glob("*.yaml"))
+    if not manifests:
+        return info
+    try:
+        text = manifests[0].read_text(encoding="utf-8", errors="replace")
+    except OSError:
+        return info
+    info["manifest"] = manifests[0]
+    root, entries = _split_installers(text)
+    info.update(_fields(root))
+    base = {k: v for k, v in info.items() if k != "installers"}
+    info["installers"] = [{**base, **_fields(e)} for e in entries]
+    return info
+
+def _url_name(entry: dict) -> str:
+    return entry.get("installer_url", "").rsplit("/", 1)[-1].split("?", 1)[0].lower()
+
+def _same_switches(entries) -> bool:
+    return len({(e["installer_type"], e["silent"], frozenset(e["success_codes"])) for e in entries}) == 1
+
+def pick_installer(stage: Path, info: dict):
+    """(file, installer entry) for the download: matched by InstallerUrl file name, else by the architecture and type in the file name; (None, None) when ambiguous."""
+    files = [p for p in stage.iterdir() if p.is_file() and p.suffix.lower() not in (".yaml", ".yml")]
+    entries = info.get("installers") or [info]
+    hits = [(p, e) for e in entries for p in files if _url_name(e) and p.name.lower() == _url_name(e)]
+    if len({p for p, e in hits}) == 1 and _same_switches([e for p, e in hits]):
+        return hits[0]
+    if len(entries) > 1:
+        hits = []
+        for p in files:
+            tokens = set(re.split(r"[_\-. ]+", p.stem.lower()))
+            for e in entries:
+                ext = TYPE_EXTS.get(e["installer_type"])
+                if e["architecture"] in tokens and (not ext or p.suffix.lower() == ext):
+                    hits.append((p, e))
+        if len({p for p, e in hits}) == 1 and _same_switches([e for p, e in hits]):
+            return hits[0]
+        return None, None
+    entry = entries[0]
+    man = info.get("manifest")
+    if man is not None:
+        for p in files:
+            if p.stem == man.stem: return p, entry
+    ext = TYPE_EXTS.get(entry.get("installer_type"))
+    typed = [p for p in files if ext and p.suffix.lower() == ext]
+    if len(typed) == 1: return typed[0], entry
+    return (files[0], entry) if len(files) == 1 else (None, None)
+
+def staged_install_cmd(stage: Path):
+    info = read_manifest(stage)
+    picked, entry = pick_installer(stage, info)
+    if picked is None:
+        return None, info
+    info = entry
+    installer = str(picked)
+    kind = info["installer_type"] or picked.suffix.lower().lstrip(".")
+    switches = info["silent"].split() if info["silent"] else []
+    if kind in ("msi", "wix"):
+        return ["msiexec", "/i", installer, "/qn", "/norestart"] + switches, info
+    if kind in DEFAULT_SILENT:
+        return [installer] + (switches or DEFAULT_SILENT[kind]), info
+    if kind == "exe" and switches:
+        return [installer] + switches, info
+    return None, info
+
+class Prefetcher:
+    def __init__(self, proc: Process, stage_dir: Path, depth: int=2, disk_cap_mb: int=4096, workers: int=2):
+        self.proc = proc
+        self.stage_dir = stage_dir
+        self.depth = max(1, int(depth))
+        self.cap_bytes = max(0, int(disk_cap_mb)) * 1024 * 1024
+        self._pool = ThreadPoolExecutor(max_workers=max(1, min(int(workers), self.depth)), thread_name_prefix="prefetch")
+        self._slots = threading.Semaphore(self.depth)
+        self._cond = threading.Condition()
+        self._used = 0
+        self._sizes = {}
+        self._futures = {}
+        self._acquired = set()
+        self._cancelled = set()
+        self._stop = threading.Event()
+        self._feeder = None
+
+    def start(self, ids: list[str]):
+        self.stage_dir.mkdir(parents=True, exist_ok=True)
+        with self._cond:
+            for pid in ids:
+                self._futures.setdefault(pid, None)
+        self._feeder = threading.Thread(target=self._feed, args=(list(ids),), daemon=True)
+        self._feeder.start()
+
+    def _feed(self, ids):
+        for pid in ids:
+            with self._cond:
+                if pid in self._cancelled: continue
+            self._slots.acquire()
+            with self._cond:
+                while self.cap_bytes and self._used >= self.cap_bytes and self._sizes and not self._stop.is_set():
+                    self._cond.wait(timeout=0.5)
+                if self._stop.is_set():
+                    self._slots.release()
+                    return
+                if pid in self._cancelled:
+                    self._slots.release()
+                    continue
+                self._acquired.add(pid)
+                self._futures[pid] = self._pool.submit(self._download, pid)
+                self._cond.notify_all()
+
+    def _download(self, pid: str):
+        target = self.stage_dir / pid
+        shutil.rmtree(target, ignore_errors=True)
+        with trace.tag(package=pid, attempt="prefetch"):
+            rc, _ = self.proc.run_capture(["winget","download","--id",pid,"--download-directory",str(target),"--accept-package-agreements","--accept-source-agreements"])
+        if rc != 0 or not target.exists():
+            shutil.rmtree(target, ignore_errors=True)
+            return None
+        size = _dir_bytes(target)
+        with self._cond:
+            self._sizes[pid] = size
+            self._used += size
+        return target
+
+    def take(self, pid: str):
+        with self._cond:
+            if pid not in self._futures:
+                return None
+            while self._futures.get(pid) is None and not self._stop.is_set():
+                self._cond.wait(timeout=0.5)
+            fut = self._futures.get(pid)
+        if fut is None:
+            return None
+        try:
+            return fut.result()
+        except Exception:
+            return None
+
+    def release(self, pid: str):
+        with self._cond:
+            fut = self._futures.pop(pid, None)
+            if pid not in self._acquired:
+                self._cancelled.add(pid)
+        if fut is not None and not fut.cancel():
+            try: fut.result()
+            except Exception: pass
+        shutil.rmtree(self.stage_dir / pid, ignore_errors=True)
+        with self._cond:
+            self._used -= self._sizes.pop(pid, 0)
+            if pid in self._acquired:
+                self._acquired.discard(pid)
+                self._slots.release()
+            self._cond.notify_all()
+
+    def close(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        for _ in range(self.depth):
+            self._slots.release()
+        self._pool.shutdown(wait=True)
+        with self._cond:
+            pending = list(self._futures)
+        for pid in pending:
+            shutil.rmtree(self.stage_dir / pid, ignore_errors=True)
@@ -1,74 +1,81 @@
-import os, shutil
-from pathlib import Path
+from ..core import trace
 from ..core.process import Process
-from ..core.powershell import PowerShell
+from ..core.colors import BOLD, RESET
+from ..core.powershell import PowerShell, events_of, result_of
 from ..core.admin import require_admin_or_msg
 
 class SystemService:
-    def __init__(self, console):
+    def __init__(self, console, cfg=None):
         self.console = console
         self.proc = Process(debug=console.debug, dry_run=console.dry_run)
         self.ps = PowerShell(self.proc)
+        d = (cfg.get_defaults() if cfg else None) or {}
+        self.temp_min_age_h = float(d.get("temp_min_age_hours", 0))
+        self.cleanup_workers = int(d.get("cleanup_workers", 8))
 
     # Pending reboot detection (best-effort)
+    @trace.traced()
     def has_pending_reboot(self) -> bool:
+        return bool(self.pending_reboot_sources())
+
+    def pending_reboot_sources(self) -> list:
         ps = r'''
-$pending = $false
-if (Test-Path "HKLM:\SOFTWARE\Microsoft\Windows\CurrentVersion\WindowsUpdate\Auto Update\RebootRequired") { $pending = $true }
-if (Test-Path "HKLM:\SOFTWARE\Microsoft\Windows\CurrentVersion\Component Based Servicing\RebootPending") { $pending = $true }
+$sources = @()
+if (Test-Path "HKLM:\SOFTWARE\Microsoft\Windows\CurrentVersion\WindowsUpdate\Auto Update\RebootRequired") { $sources += "WindowsUpdate" }
+if (Test-Path "HKLM:\SOFTWARE\Microsoft\Windows\CurrentVersion\Component Based Servicing\RebootPending") { $sources += "CBS" }
 try {
   $v = (Get-ItemProperty "HKLM:\SYSTEM\CurrentControlSet\Control\Session Manager" -ErrorAction Stop).PendingFileRenameOperations
-  if ($v) { $pending = $true }
+  if ($v) { $sources += "PendingFileRename" }
 } catch { }
 try {
   $s = (Get-ItemProperty "HKLM:\SOFTWARE\Microsoft\Windows\CurrentVersion\Component Based Servicing" -ErrorAction Stop)."CBSRebootPending"
-  if ($s) { $pending = $true }
+  if ($s) { $sources += "CBSRebootPending" }
 } catch { }
-if ($pending) { Write-Host "True" } else { Write-Host "False" }
+Send-SenseiEvent result @{ pending = ($sources.Count -gt 0); sources = @($sources) }
 '''
-        rc, out = self.proc.run_capture([self.ps.exe, "-NoLogo","-NoProfile","-NonInteractive","-ExecutionPolicy","Bypass","-Command", ps])
-        if rc != 0:
-            return False
-        return "True" in (out or "")
+        if self.proc.dry_run: return []
+        rc, events = self.ps.events(ps, echo=False)
+        res = result_of(events)
+        if rc != 0 or not res.get("pending"):
+            return []
+        return list(res.get("sources") or ["unknown"])
 
+    @trace.traced()
     def empty_recycle_bin(self):
         if not require_admin_or_msg(self.console, "Empty Recycle Bin"): return
         self.console.header("Emptying Recycle Bin")
-        rc = self.ps.run(r'''
-try {
-  Clear-RecycleBin -Force -ErrorAction SilentlyContinue
-  Write-Host "Recycle Bin emptied (or already empty)."
-} catch {
-  Write-Warning "Failed to empty Recycle Bin: $($_.Exception.Message)"
+        rc, events = self.ps.events(r'''
+if (@((New-Object -ComObject Shell.Application).Namespace(0xA).Items()).Count -gt 0) {
+  Clear-RecycleBin -Force -ErrorAction Stop
 }
+Send-SenseiEvent result @{ ok = $true }
 ''')
-        if rc == 0: self.console.ok("Recycle Bin emptied.")
-        else:       self.console.warn("Could not empty Recycle Bin.")
+        if rc == 0 and (result_of(events).get("ok") or self.proc.dry_run): self.console.ok("Recycle Bin emptied.")
+        else:
+            for e in events_of(events, "error"): self.console.warn(e.get("message") or "")
+            self.console.warn("Could not empty Recycle Bin.")
 
-    def cleanup_temp(self):
-        if not require_admin_or_msg(self.console, "Clean TEMP folders"): return
-        self.console.header("Cleaning TEMP folders")
-        candidates = set()
-        for var in ("TEMP","TMP"):
-            p = os.environ.get(var)
-            if p: candidates.add(Path(p))
-        candidates.add(Path(r"C:\Windows\Temp"))
-        deleted = 0
-        for root in candidates:
-            try:
-                if root.exists():
-                    for item in root.iterdir():
-                        try:
-                            if item.is_file() or item.is_symlink():
-                                item.unlink(missing_ok=True); deleted += 1
-                            elif item.is_dir():
-                                shutil.rmtree(item, ignore_errors=True); deleted += 1
-                        except Exception:
-                            pass
-            except Exception:
-                pass
-        self.console.ok(f"Removed ~{deleted} temp items (best effort).")
+    @trace.traced()
+    def cleanup_temp(self, estimate: bool=False, min_age_h: float | None=None):
+        estimate = estimate or self.proc.dry_run
+        if not estimate and not require_admin_or_msg(self.console, "Clean TEMP folders"): return None
+        from .tempclean import TempCleaner, temp_roots
+        self.console.header("Estimating reclaimable TEMP space" if estimate else "Cleaning TEMP folders")
+        age = self.temp_min_age_h if min_age_h is None else min_age_h
+        if age > 0: self.console.info(f"Only entries older than {age:g} h.")
+        res = TempCleaner(min_age_h=age, workers=self.cleanup_workers, estimate=estimate).run(temp_roots())
+        for r in res["roots"]:
+            extra = f", {r['skipped']} in use" if r["skipped"] else ""
+            print(f"  {r['root']}: {r['files']} file(s), {r['bytes'] / 1048576:.1f} MB{extra}")
+        mb = res["bytes"] / 1048576
+        if estimate:
+            self.console.ok(f"Reclaimable: {res['files']} file(s), {mb:.1f} MB (scanned in {res['duration_s']:.1f} s).")
+        else:
+            self.console.ok(f"Removed {res['files']} file(s) and {res['dirs']} folder(s), {mb:.1f} MB freed in {res['duration_s']:.1f} s"
+                            + (f"; {res['skipped']} in use." if res["skipped"] else "."))
+        return res
 
+    @trace.traced()
     def dism_sfc(self):
         if not require_admin_or_msg(self.console, "System Health (DISM + SFC)"): return
         self.console.header("System Health: DISM + SFC")
@@ -80,15 +87,31 @@ try {
         self.proc.run_stream(["sfc","/scannow"])
         self.console.ok("Health scan completed. Review output above for any repairs.")
 
+    def list_startup(self) -> list | None:
+        rc, events = self.ps.events(r'''
+Get-CimInstance Win32_StartupCommand | Sort-Object Name | ForEach-Object {
+  Send-SenseiEvent row @{ Name = [string]$_.Name; Command = [string]$_.Command; Location = [string]$_.Location; User = [string]$_.User }
+}
+Send-SenseiEvent result @{ ok = $true }
+''', echo=False)
+        if rc != 0 or not (result_of(events) or self.proc.dry_run):
+            return None
+        return [{k: r.get(k) or "" for k in ("Name", "Command", "Location", "User")} for r in events_of(events, "row")]
+
     def show_startup(self):
         self.console.header("Startup Programs")
-        self.ps.run(r'''
-Get-CimInstance Win32_StartupCommand |
-  Select-Object Name, Command, Location |
-  Sort-Object Name |
-  Format-Table -AutoSize
-''')
-        
+        rows = self.list_startup()
+        if rows is None:
+            self.console.err("Could not read startup programs.")
+            return
+        if not rows:
+            self.console.info("No startup programs found.")
+            return
+        w = min(max(len(r["Name"]) for r in rows), 40)
+        print(f"{BOLD}{'Name':<{w}}  {'Location':<28}  Command{RESET}")
+        for r in rows:
+            print(f"{r['Name'][:w]:<{w}}  {r['Location'][:28]:<28}  {r['Command']}")
+
     def open_store_library(self):
         try:
             rc = self.proc.run_stream(["cmd", "/c", "start", "ms-windows-store://downloadsandupdates"])
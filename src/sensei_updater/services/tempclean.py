@@ -0,0 +1,137 @@
+import os, stat, time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from ..core import trace
+
+CHUNK = 512
+COUNTS = ("files", "bytes", "dirs", "skipped", "errors")
+
+def temp_roots() -> list:
+    windir = os.environ.get("SystemRoot") or r"C:\Windows"
+    seen, roots = set(), []
+    for p in (os.environ.get("TEMP"), os.environ.get("TMP"), os.path.join(windir, "Temp")):
+        if not p: continue
+        key = os.path.normcase(os.path.realpath(p))
+        if key in seen: continue
+        seen.add(key)
+        roots.append(Path(p))
+    return roots
+
+def _is_link(st) -> bool:
+    return stat.S_ISLNK(st.st_mode) or bool(getattr(st, "st_file_attributes", 0) & stat.FILE_ATTRIBUTE_REPARSE_POINT)
+
+class TempCleaner:
+    def __init__(self, min_age_h: float=0, workers: int=8, estimate: bool=False):
+        self.min_age_h = max(0.0, float(min_age_h))
+        self.cutoff = time.time() - self.min_age_h * 3600
+        self.workers = max(1, int(workers))
+        self.estimate = estimate
+
+    def _old(self, st) -> bool:
+        return self.min_age_h <= 0 or st.st_mtime < self.cutoff
+
+    def _remove(self, path: str, st, c: dict):
+        link = _is_link(st)
+        if not self.estimate:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                return
+            except PermissionError:
+                try:
+                    if link:
+                        os.rmdir(path)
+                    elif st.st_mode & stat.S_IWRITE:
+                        c["skipped"] += 1
+                        return
+                    else:
+                        os.chmod(path, stat.S_IWRITE)
+                        os.unlink(path)
+                except OSError:
+                    c["skipped"] += 1
+                    return
+            except OSError:
+                c["errors"] += 1
+                return
+        c["files"] += 1
+        c["bytes"] += 0 if link else st.st_size
+
+    def _files(self, batch) -> dict:
+        c = dict.fromkeys(COUNTS, 0)
+        for path, st in batch:
+            self._remove(path, st, c)
+        return c
+
+    def _tree(self, path: str, st) -> dict:
+        c = dict.fromkeys(COUNTS, 0)
+        stack = [(path, st, False)]
+        while stack:
+            p, pst, listed = stack.pop()
+            if listed:
+                if not self.estimate and self._old(pst):
+                    try:
+                        os.rmdir(p)
+                        c["dirs"] += 1
+                    except OSError:
+                        pass
+                continue
+            stack.append((p, pst, True))
+            try:
+                with os.scandir(p) as it:
+                    for e in it:
+                        try:
+                            est = e.stat(follow_symlinks=False)
+                        except OSError:
+                            c["errors"] += 1
+                            continue
+                        if stat.S_ISDIR(est.st_mode) and not _is_link(est):
+                            stack.append((e.path, est, False))
+                        elif self._old(est):
+                            self._remove(e.path, est, c)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                c["errors"] += 1
+        return c
+
+    def _root(self, pool, root: Path) -> dict:
+        t = time.perf_counter()
+        c = dict.fromkeys(COUNTS, 0)
+        with trace.span("cleanup root", root=str(root), estimate=self.estimate) as args:
+            futures, batch = [], []
+            try:
+                with os.scandir(root) as it:
+                    for e in it:
+                        try:
+                            st = e.stat(follow_symlinks=False)
+                        except OSError:
+                            c["errors"] += 1
+                            continue
+                        if stat.S_ISDIR(st.st_mode) and not _is_link(st):
+                            futures.append(pool.submit(self._tree, e.path, st))
+                        elif self._old(st):
+                            batch.append((e.path, st))
+                            if len(batch) >= CHUNK:
+                                futures.append(pool.submit(self._files, batch))
+                                batch = []
+            except FileNotFoundError:
+                pass
+            except OSError:
+                c["errors"] += 1
+            if batch:
+                futures.append(pool.submit(self._files, batch))
+            for f in futures:
+                for k, v in f.result().items():
+                    c[k] += v
+            if args is not None: args.update(c)
+        return {"root": str(root), **c, "duration_s": round(time.perf_counter() - t, 3)}
+
+    def run(self, roots) -> dict:
+        t = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="cleanup") as pool:
+            per_root = [self._root(pool, Path(r)) for r in roots]
+        out = {"mode": "estimate" if self.estimate else "delete", "min_age_h": self.min_age_h, "roots": per_root}
+        for k in COUNTS:
+            out[k] = sum(r[k] for r in per_root)
+        out["duration_s"] = round(time.perf_counter() - t, 3)
+        return out
@@ -0,0 +1,191 @@
+import re, unicodedata
+
+VERSION_RX = re.compile(r"[0-9]+(\.[0-9A-Za-z\-+]+)+")
+ID_RX = re.compile(r"[A-Za-z0-9][A-Za-z0-9\-\._]+[A-Za-z0-9]")
+GAP_RX = re.compile(r"\s{2,}")
+HEADER_CELL_RX = re.compile(r"\S+")
+SEPARATOR_RX = re.compile(r"^-{3,}$")
+NON_ASCII_RX = re.compile(r"[^\x00-\x7f]")
+SOURCES = ("winget", "msstore", "store", "msi", "exe", "msix")
+SKIP_PREFIXES = ("found ", "the following", "no ")
+ELLIPSIS = "…"
+LINE_BREAKS = "\r\n\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+
+LABELS = {
+    "name": "Name",
+    "id": "Id", "kennung": "Id",
+    "version": "Version",
+    "available": "Available", "verfügbar": "Available", "disponible": "Available", "disponibile": "Available", "beschikbaar": "Available",
+    "source": "Source", "quelle": "Source", "origen": "Source", "origine": "Source", "bron": "Source",
+    "match": "Match", "übereinstimmung": "Match",
+}
+POSITIONAL = ("Name", "Id", "Version", "Available", "Source")
+
+def looks_like_version(s: str) -> bool:
+    return bool(s) and VERSION_RX.fullmatch(s) is not None
+
+def looks_like_id(s: str) -> bool:
+    return bool(s) and "." in s and ID_RX.fullmatch(s) is not None
+
+def _pad_wide(m) -> str:
+    c = m.group(0)
+    return c + "\0" if unicodedata.east_asian_width(c) in ("W", "F") else c
+
+def _cells(s: str) -> str:
+    """`s` with a NUL after every double-width character, so len() and slicing work in display cells."""
+    if s.isascii():
+        return s
+    return NON_ASCII_RX.sub(_pad_wide, unicodedata.normalize("NFC", s))
+
+def cell_width(s: str) -> int:
+    return len(_cells(s))
+
+def _visible(line: str) -> str:
+    return line.rsplit("\r", 1)[-1].rstrip()
+
+def column_spans(header: str):
+    cells = [(m.group(0), cell_width(header[:m.start()])) for m in HEADER_CELL_RX.finditer(header)]
+    keys = [LABELS.get(label.lower()) for label, _ in cells]
+    if None in keys or len(set(keys)) != len(keys):
+        if len(cells) != len(POSITIONAL): return None
+        keys = list(POSITIONAL)
+    spans = []
+    for i, (key, (_, start)) in enumerate(zip(keys, cells)):
+        end = cells[i + 1][1] if i + 1 < len(cells) else None
+        spans.append((key, start, end))
+    return spans
+
+def slice_row(line: str, spans) -> dict:
+    cells = _cells(line)
+    if cells is line:
+        return {key: line[start:end].strip() for key, start, end in spans}
+    return {key: cells[start:end].replace("\0", "").strip() for key, start, end in spans}
+
+def _row_slices(spans):
+    by_key = {key: slice(start, end) for key, start, end in spans}
+    empty = slice(0, 0)
+    return tuple(by_key.get(k, empty) for k in POSITIONAL)
+
+def heuristic_row(line: str):
+    t = line.strip()
+    if not t or t.lower().startswith(SKIP_PREFIXES): return None
+    cols = GAP_RX.split(t)
+    if len(cols) < 2: return None
+    name = cols[0]
+    if looks_like_id(cols[1]) and not looks_like_version(cols[1]):
+        pid = cols[1]
+        version   = cols[2] if len(cols) >= 3 else ""
+        available = cols[3] if len(cols) >= 4 else ""
+        source    = cols[4] if len(cols) >= 5 else ""
+    elif len(cols) >= 3 and looks_like_version(cols[1]) and looks_like_id(cols[2]):
+        pid = cols[2]
+        version   = cols[1]
+        available = cols[3] if len(cols) >= 4 else ""
+        source    = cols[4] if len(cols) >= 5 else ""
+    else:
+        pid = version = available = source = ""
+        for c in cols[1:]:
+            if not pid and looks_like_id(c) and not looks_like_version(c): pid = c
+            elif not version and looks_like_version(c): version = c
+            elif not available and looks_like_version(c): available = c
+            elif not source and c.lower() in SOURCES: source = c
+    if not pid: return None
+    return {"Name": name, "Id": pid, "Version": version, "Available": available, "Source": source}
+
+def _fixed_row(line: str, slices):
+    sn, si, sv, sa, ss = slices
+    cells = _cells(line)
+    pid = cells[si].strip()
+    if not looks_like_id(pid) or looks_like_version(pid): return None
+    source = cells[ss].strip()
+    if " " in source: return None
+    name = cells[sn].strip()
+    version = cells[sv].strip()
+    available = cells[sa].strip()
+    if cells is not line:
+        name, version, available = name.replace("\0", ""), version.replace("\0", ""), available.replace("\0", "")
+    return {"Name": name, "Id": pid, "Version": version, "Available": available, "Source": source}
+
+def parse_table_heuristic(text: str):
+    dedup = {}
+    for ln in (text or "").splitlines():
+        r = heuristic_row(_visible(ln))
+        if r: dedup[r["Id"]] = r
+    return list(dedup.values())
+
+class TableStream:
+    """Incremental `parse_table`: after `close()`, `rows()` equals parsing the whole text at once."""
+    def __init__(self):
+        self._tail = ""
+        self._index = 0
+        self._last = None
+        self._pending = None
+        self._preamble = []
+        self._in_table = False
+        self._spans = self._slices = None
+        self._rows = {}
+
+    def feed(self, text: str) -> list:
+        text = self._tail + (text or "")
+        parts = text.splitlines(keepends=True)
+        self._tail = ""
+        if parts and (parts[-1].endswith("\r") or parts[-1] == parts[-1].rstrip(LINE_BREAKS)):
+            self._tail = parts.pop()
+        out = []
+        for part in parts:
+            self._line(part.rstrip(LINE_BREAKS), out)
+        return out
+
+    def close(self) -> list:
+        out = []
+        if self._tail:
+            tail, self._tail = self._tail, ""
+            for ln in tail.splitlines():
+                self._line(ln, out)
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            if self._in_table: self._body(pending, out)
+            else: self._preamble.append(pending)
+        if not self._in_table:
+            for r in parse_table_heuristic("\n".join(self._preamble)):
+                self._rows[r["Id"]] = r
+                out.append(r)
+            self._preamble = []
+        return out
+
+    def rows(self) -> list:
+        return list(self._rows.values())
+
+    def _line(self, line: str, out: list):
+        i = self._index
+        self._index += 1
+        if i > 0 and line.startswith("---") and SEPARATOR_RX.match(line.strip()):
+            self._spans = column_spans((self._last or "").rstrip())
+            self._slices = _row_slices(self._spans) if self._spans else None
+            self._in_table = True
+            self._preamble = []
+            self._pending = None
+            self._last = line
+            return
+        pending, self._pending = self._pending, line
+        self._last = line
+        if pending is None: return
+        if self._in_table: self._body(pending, out)
+        else: self._preamble.append(pending)
+
+    def _body(self, ln: str, out: list):
+        if not ln or ln.isspace(): return
+        r = _fixed_row(ln, self._slices) if self._slices else None
+        if r is None:
+            if self._spans and slice_row(ln, self._spans).get("Id", "").endswith(ELLIPSIS): return
+            r = heuristic_row(ln)
+        if r:
+            self._rows[r["Id"]] = r
+            out.append(r)
+
+def parse_table(text: str):
+    """Slices each row at the column offsets of the header above the dashed line; rows that do not fit go through the heuristic."""
+    t = TableStream()
+    t.feed(text)
+    t.close()
+    return t.rows()
@@ -1,6 +1,8 @@
+import re
 from ..core.colors import *
 from .selector import Selector
 from ..domain.reports import RunReport
+from .summary import print_summary
 
 class Menu:
     def __init__(self, console, app, drivers, system, cfg, scheduler=None):
@@ -13,21 +15,7 @@ class Menu:
         self.scheduler = scheduler
 
     def _print_summary(self, r: RunReport):
-        r.mark_finished()
-        self.console.header("Summary")
-        print(f"Driver success: {r.driver_success}")
-        print(f"Reboot required: {r.reboot_required}")
-        def show(label, arr, color=WHITE):
-            if arr:
-                print(f"{color}{label}:{RESET} " + ", ".join(arr))
-        show("Updated", r.updated, GREEN)
-        show("Updated (interactive)", r.interactive, CYAN)
-        show("Reinstalled", r.reinstalled, MAGENTA)
-        show("Skipped", r.skipped, GRAY)
-        show("Store skipped (admin)", r.store_skipped, YELLOW)
-        show("Failed", r.failed, RED)
-        if r.notes:
-            print("Notes: " + "; ".join(r.notes))
+        print_summary(self.console, r)
 
     def _schedule_menu(self):
         s = self.cfg.get_schedule()
@@ -185,6 +173,21 @@ class Menu:
             else:
                 self.console.warn("Invalid choice.")
 
+    def _drivers_menu(self):
+        self.console.header("Driver Updates via Windows Update (Drivers category)")
+        rows = self.drivers.scan_drivers()
+        if rows is None: return (False, False)
+        if not rows:
+            self.console.ok("No driver updates available.")
+            return (True, False)
+        self.drivers.print_rows(rows)
+        pick = input(f"{ORANGE1}{BOLD}Install which? (numbers, Enter = all, 0 = none) {RESET}").strip()
+        if pick == "0": return (True, False)
+        if pick:
+            idx = {int(t) for t in re.split(r"[\s,]+", pick) if t.isdigit()}
+            rows = [r for i, r in enumerate(rows, 1) if i in idx]
+        return self.drivers.install_drivers([r["UpdateId"] for r in rows])
+
     def run(self):
         while True:
             self.console.pixel_art()
@@ -210,22 +213,26 @@ class Menu:
                 self.drivers.create_restore_point()
             elif choice == "2":
                 report = RunReport()
-                ok, reboot = self.drivers.update_drivers()
+                with report.phase("drivers"):
+                    ok, reboot = self._drivers_menu()
                 report.driver_success = ok
                 report.reboot_required = reboot
                 self._print_summary(report)
             elif choice == "3":
-                upgrades = self.app.list_upgrades()
+                upgrades = self.selector.scan(lambda on_row: self.app.list_upgrades(on_row=on_row, stale_ok=True), title="Upgradable Apps (winget)")
                 if upgrades:
-                    chosen = self.selector.loop(upgrades, self.app, title="Upgradable Apps (winget)")
+                    chosen = self.selector.loop(upgrades, self.app, title="Upgradable Apps (winget)", shown=True)
+                    chosen = self.app.revalidate_ids(chosen or [], upgrades)
                 else:
                     self.console.warn("No upgrades detected by winget.")
                     self.console.info("Showing installed apps so you can pick targets by Id.")
-                    installed = self.app.list_installed()
+                    title = "Installed Apps (select any to attempt upgrade)"
+                    installed = self.selector.scan(self.app.list_installed, title=title)
                     if not installed:
                         self.console.warn("Could not read installed apps. Try updating winget (App Installer).")
                         continue
-                    chosen = self.selector.loop(installed, self.app, title="Installed Apps (select any to attempt upgrade)")
+                    chosen = self.selector.loop(installed, self.app, title=title, shown=True)
+                    upgrades = installed
                 if chosen:
                     self.console.header("Update Plan (per-package)")
                     for pid in chosen: print(f"{GREEN}✔ {pid}{RESET}")
@@ -233,13 +240,9 @@ class Menu:
                     confirm = input(f"{ORANGE1}{BOLD}Proceed with these updates? (y/N) {RESET}").strip().lower()
                     if confirm == "y":
                         r = RunReport()
-                        res = self.app.update_ids(chosen)
-                        r.updated.extend(res["updated"])
-                        r.interactive.extend(res["interactive"])
-                        r.reinstalled.extend(res["reinstalled"])
-                        r.skipped.extend(res["skipped"])
-                        r.store_skipped.extend(res["store_skipped"])
-                        r.failed.extend(res["failed"])
+                        with r.phase("apps"):
+                            res = self.app.update_ids(chosen, rows=upgrades)
+                        r.add_results(res)
                         self._print_summary(r)
             elif choice == "4":
                 self.system.cleanup_temp(); self.system.empty_recycle_bin()
@@ -250,19 +253,18 @@ class Menu:
             elif choice == "7":
                 r = RunReport()
                 self.drivers.create_restore_point("Sensei_Quick_RP")
-                ok, reboot = self.drivers.update_drivers()
+                with r.phase("drivers"):
+                    ok, reboot = self.drivers.update_drivers()
                 r.driver_success = ok
                 r.reboot_required = reboot
-                upgrades = self.app.list_upgrades()
+                with r.phase("scan"):
+                    upgrades = self.app.list_upgrades()
                 if upgrades:
-                    res = self.app.update_ids([p["Id"] for p in upgrades])
-                    r.updated.extend(res["updated"])
-                    r.interactive.extend(res["interactive"])
-                    r.reinstalled.extend(res["reinstalled"])
-                    r.skipped.extend(res["skipped"])
-                    r.store_skipped.extend(res["store_skipped"])
-                    r.failed.extend(res["failed"])
-                self.system.cleanup_temp(); self.system.empty_recycle_bin()
+                    with r.phase("apps"):
+                        res = self.app.update_ids([p["Id"] for p in upgrades], rows=upgrades)
+                    r.add_results(res)
+                with r.phase("cleanup"):
+                    r.cleanup = self.system.cleanup_temp(); self.system.empty_recycle_bin()
                 self.console.header("Quick Maintenance")
                 self.console.ok("All quick tasks completed. If drivers were installed, consider rebooting.")
                 self._print_summary(r)
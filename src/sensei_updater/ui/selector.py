@@ -6,6 +6,19 @@ class Selector:
         self.console = console
         self.cfg = cfg
 
+    def _print_head(self, w: int):
+        print(f"{ORANGE1}{BOLD}{'#'.rjust(w)}  {'Sel':3}  {'Name':40}  {'Id':34}  {'Installed':>12}  {'Available':>12}  {'Src':4}{RESET}")
+
+    def _print_row(self, i: int, p, selected, w: int):
+        sel = "✔" if p["Id"] in selected else " "
+        name=(p.get("Name",""))[:40].ljust(40)
+        pid =(p.get("Id",""))[:34].ljust(34)
+        ver =(p.get("Version",""))[:12].rjust(12)
+        ava =(p.get("Available",""))[:12].rjust(12)
+        src =(p.get("Source",""))[:4].ljust(4)
+        color = GREEN if sel=="✔" else GRAY
+        print(f"{SUN}{str(i).rjust(w)}{RESET}   {color}{sel:3}{RESET}  {WHITE}{name}{RESET}  {GRAY}{pid}{RESET}  {ver}  {ava}  {src}", flush=True)
+
     def print_table(self, pkgs, selected=None, title="Upgradable Apps (winget)"):
         selected = selected or set()
         self.console.header(title)
@@ -13,22 +26,32 @@ class Selector:
             self.console.warn("No entries found.")
             return
         w = len(str(len(pkgs)))
-        print(f"{ORANGE1}{BOLD}{'#'.rjust(w)}  {'Sel':3}  {'Name':40}  {'Id':34}  {'Installed':>12}  {'Available':>12}  {'Src':4}{RESET}")
+        self._print_head(w)
         for i,p in enumerate(pkgs,1):
-            sel = "✔" if p["Id"] in selected else " "
-            name=(p.get("Name",""))[:40].ljust(40)
-            pid =(p.get("Id",""))[:34].ljust(34)
-            ver =(p.get("Version",""))[:12].rjust(12)
-            ava =(p.get("Available",""))[:12].rjust(12)
-            src =(p.get("Source",""))[:4].ljust(4)
-            color = GREEN if sel=="✔" else GRAY
-            print(f"{SUN}{str(i).rjust(w)}{RESET}   {color}{sel:3}{RESET}  {WHITE}{name}{RESET}  {GRAY}{pid}{RESET}  {ver}  {ava}  {src}")
+            self._print_row(i, p, selected, w)
 
-    def loop(self, pkgs, app_service, title):
+    def scan(self, producer, title="Upgradable Apps (winget)"):
+        self.console.header(title)
+        print(f"{GRAY}Scanning via winget…{RESET}", flush=True)
+        shown = []
+        def on_row(p):
+            if not shown: self._print_head(3)
+            shown.append(p["Id"])
+            self._print_row(len(shown), p, set(), 3)
+        rows = producer(on_row=on_row)
+        if not rows:
+            self.console.warn("No entries found.")
+        elif [p["Id"] for p in rows] != shown:
+            self.print_table(rows, title=title)
+        return rows
+
+    def loop(self, pkgs, app_service, title, shown: bool=False):
         selected = set()
         while True:
-            self.console.pixel_art()
-            self.print_table(pkgs, selected, title)
+            if not shown:
+                self.console.pixel_art()
+                self.print_table(pkgs, selected, title)
+            shown = False
             print()
             print(f"{ORANGE1}{BOLD}Commands{RESET}: numbers (e.g. 1,3,5) | all | none |")
             print("  filter <text>      — show rows containing text")
@@ -54,7 +77,13 @@ class Selector:
             if cmd.startswith("filter "):
                 q = cmd[7:].strip().lower()
                 flt = [p for p in pkgs if q in (p.get("Name","").lower()) or q in (p.get("Id","").lower())]
-                self.print_table(flt, selected, title=f"Filtered: '{q}'"); continue
+                self.print_table(flt, selected, title=f"Filtered: '{q}'")
+                shown_ids = {p["Id"] for p in pkgs}
+                more = [p for p in app_service.search_installed(q) if p["Id"] not in shown_ids]
+                if more:
+                    self.print_table(more, selected, title=f"Other installed apps matching '{q}'")
+                    print(f"{GRAY}Tip: use 'add <id>' to add any of these ids to your selection.{RESET}")
+                continue
             if cmd.startswith("search "):
                 q = cmd[7:].strip()
                 rc,out = app_service.proc.run_capture(["winget","search",q])
@@ -98,10 +127,10 @@ class Selector:
                 continue
             if cmd.startswith("u "):
                 arg = cmd[2:].strip()
-                if arg=="all": app_service.update_ids(list(selected))
+                if arg=="all": app_service.update_ids(list(selected), rows=pkgs)
                 else:
                     if not arg: self.console.warn("Usage: u <id>  |  u all")
-                    else: app_service.update_ids([arg])
+                    else: app_service.update_ids([arg], rows=pkgs)
                 continue
             if cmd=="go":
                 if not selected: self.console.warn("No packages selected."); continue
@@ -0,0 +1,42 @@
+from ..core.colors import *
+from ..domain.reports import usage_text
+
+def print_summary(console, r):
+    r.mark_finished()
+    console.header("Summary")
+    print(f"Driver success: {r.driver_success}")
+    print(f"Reboot required: {r.reboot_required}")
+    def show(label, arr, color=WHITE):
+        if arr:
+            print(f"{color}{label}:{RESET} " + ", ".join(arr))
+    show("Updated", r.updated, GREEN)
+    show("Updated (interactive)", r.interactive, CYAN)
+    show("Reinstalled", r.reinstalled, MAGENTA)
+    show("Skipped", r.skipped, GRAY)
+    show("Store skipped (admin)", r.store_skipped, YELLOW)
+    show("Failed", r.failed, RED)
+    show("Already current", r.current, GRAY)
+    show("Deferred (retry next run)", r.deferred, YELLOW)
+    for p in r.packages:
+        if p.get("reason") and p.get("outcome") in ("failed", "deferred"):
+            print(f"  {GRAY}{p['id']}: {p['reason']} ({p['code']}){RESET}")
+    for t in r.install_timings:
+        detail = f"{t.get('mode')} {t.get('total_s', 0):.1f} s for {t.get('packages', 0)} package(s)"
+        if t.get("mode") == "batch":
+            detail += f" (batch {t.get('batch_s', 0):.1f} s, rescan {t.get('rescan_s', 0):.1f} s, {t.get('fallbacks', 0)} fallback(s) {t.get('fallback_s', 0):.1f} s)"
+        print(f"{GRAY}App installs: {detail}{RESET}")
+    c = r.cleanup
+    if c:
+        verb = "reclaimable" if c["mode"] == "estimate" else "freed"
+        print(f"{GRAY}TEMP cleanup: {c['files']} file(s), {c['bytes'] / 1048576:.1f} MB {verb} in {c['duration_s']:.1f} s"
+              + (f", {c['skipped']} in use" if c["skipped"] else "") + f"{RESET}")
+    slow = r.slowest()
+    if slow:
+        print(f"{WHITE}Slowest packages:{RESET}")
+        for p in slow:
+            tries = len(p.get("attempts") or [])
+            print(f"  {p['id']}  {p['duration_s']:.1f} s  {GRAY}{p.get('outcome') or '-'}, {tries} attempt(s){RESET}")
+    for ph in r.phases:
+        print(f"{GRAY}{ph['name'].capitalize()}: {ph['duration_s']:.1f} s{usage_text(ph.get('resources'))}{RESET}")
+    if r.notes:
+        print("Notes: " + "; ".join(r.notes))
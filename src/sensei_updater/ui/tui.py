@@ -4,11 +4,13 @@ from textual.widgets import Header, Footer, DataTable, Static, Button, Input
 from textual.containers import Vertical, Horizontal
 from textual.worker import Worker
 from textual.message import Message
+from ..services.apps import format_age
 
 class UpgradesLoaded(Message):
-    def __init__(self, rows: List[Dict]):
+    def __init__(self, rows: List[Dict], stale_age_s: float | None=None):
         super().__init__()
         self.rows = rows
+        self.stale_age_s = stale_age_s
 
 class UpdateFinished(Message):
     def __init__(self, ok_ids: List[str]):
@@ -62,19 +64,40 @@ class UpdaterTUI(App):
         if self._scan_worker and not self._scan_worker.is_finished:
             return
         self.set_status("Scanning for app updates…")
-        self._scan_worker = self.run_worker(self._load_rows(), exclusive=True, group="scan", name="scan")
+        self.reset_rows()
+        self._scan_worker = self.run_worker(self._load_rows, thread=True, exclusive=True, group="scan", name="scan")
 
-    async def _load_rows(self):
-        rows = self.app_service.list_upgrades() or []
+    def _load_rows(self):
+        on_row = lambda r: self.call_from_thread(self.add_streamed_row, r)
+        rows = self.app_service.list_upgrades(on_row=on_row, stale_ok=True) or []
         if not rows:
-            rows = self.app_service.list_installed() or []
-        await self.post_message(UpgradesLoaded(rows))
+            self.call_from_thread(self.reset_rows)
+            rows = self.app_service.list_installed(on_row=on_row) or []
+        age = self.app_service.served_age_s
+        self.post_message(UpgradesLoaded(rows, age))
+        if age is not None:
+            fresh = self.app_service.await_refresh()
+            if fresh is not None:
+                self.post_message(UpgradesLoaded(fresh))
+
+    def reset_rows(self):
+        self.rows = []
+        self.table.clear()
+
+    def add_streamed_row(self, r: Dict):
+        self.rows.append(r)
+        pid = r.get("Id","")
+        sel = "✔" if pid in self.selected_ids else ""
+        self.table.add_row(sel, r.get("Name",""), pid, r.get("Version",""), r.get("Available",""), r.get("Source",""))
+        self.set_status(f"Scanning for app updates… {len(self.rows)} found")
 
     def on_upgrades_loaded(self, msg: UpgradesLoaded):
         self.rows = msg.rows or []
         self.rebuild_table(self.rows)
         if not self.rows:
             self.set_status("No apps found.")
+        elif msg.stale_age_s is not None:
+            self.set_status(f"Loaded {len(self.rows)} rows from the scan {format_age(msg.stale_age_s)} ago; refreshing…")
         else:
             self.set_status(f"Loaded {len(self.rows)} rows.")
 
@@ -133,7 +156,7 @@ class UpdaterTUI(App):
             self.exit()
 
     async def _do_update(self, ids: List[str]):
-        res = self.app_service.update_ids(ids)
+        res = self.app_service.update_ids(ids, rows=self.rows)
         ok = list(res.get("updated", [])) + list(res.get("interactive", [])) + list(res.get("reinstalled", []))
         await self.post_message(UpdateFinished(ok))
 